@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmarking the throughput of hash_many and verify_many
+as the number of workers grows.
+
+Usage: ./benchmark_passwords.py [-n COUNT] [--processes]
+"""
+
+
+import argparse
+import os
+import time
+from typing import List
+from encrypt_password import hash_many, verify_many
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Printing hashes/s and verifications/s for 1 worker up to
+    twice the CPU count.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--count', type=int, default=16,
+                        help="passwords per run (default: 16)")
+    parser.add_argument('--processes', action='store_true',
+                        help="use a process pool instead of threads")
+    args = parser.parse_args(argv)
+
+    passwords = ['password_{}'.format(i) for i in range(args.count)]
+    hashes = list(hash_many(passwords))
+    cpus = os.cpu_count() or 1
+    workers = 1
+    print('{:>8} {:>10} {:>10}'.format('workers', 'hash/s', 'verify/s'))
+    while workers <= 2 * cpus:
+        started = time.perf_counter()
+        list(hash_many(passwords, workers, args.processes))
+        hashed = time.perf_counter() - started
+        started = time.perf_counter()
+        assert all(verify_many(zip(hashes, passwords), workers,
+                               args.processes))
+        verified = time.perf_counter() - started
+        print('{:>8} {:>10.1f} {:>10.1f}'.format(
+            workers, args.count / hashed, args.count / verified))
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
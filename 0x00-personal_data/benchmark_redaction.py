@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite of the redaction of log messages.
+
+Times filter_datum (and its original per-call regex version),
+the tokenizing and trie engines and RedactingFormatter.format on
+synthetic rows modeled on user_data.csv, across field counts, message
+sizes, separators and hit ratios, the cost of a user_data.csv line as
+the field list grows, and the database export of main().
+Results are written as JSON, two runs can be compared to flag
+regressions.
+
+Usage:
+    ./benchmark_redaction.py [--quick] [-o results.json]
+    ./benchmark_redaction.py --compare old.json new.json [-t 0.1]
+"""
+
+
+import argparse
+import csv
+import functools
+import io
+import json
+import logging
+import platform
+import random
+import re
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Sequence
+import filtered_logger
+from filtered_logger import (PII_FIELDS, USER_COLUMNS, RedactingFormatter,
+                             filter_datum, get_redactor)
+from sqlite_users import create_users_table, get_sqlite_db
+
+
+FULL_GRID = {
+    'field_counts': (1, 5, 50, 500),
+    'sizes': (100, 1024, 16384, 65536),
+    'separators': (';', '|', '\t'),
+    'hit_ratios': (0.0, 0.5, 1.0),
+}
+
+QUICK_GRID = {
+    'field_counts': (1, 5, 500),
+    'sizes': (100, 65536),
+    'separators': (';',),
+    'hit_ratios': (0.0, 1.0),
+}
+
+# Field list sizes of the scaling cases, PII_FIELDS plus absent keys
+SCALING_FIELD_COUNTS = (5, 50, 200, 1000)
+
+
+def legacy_filter_datum(
+    fields: List[str],
+    redaction: str,
+    message: str,
+    separator: str
+) -> str:
+    """
+    The original filter_datum, building the regex on every call.
+    """
+    return re.sub(
+        fr'({"|".join(fields)})=[^\\{separator}]+',
+        rf'\1={redaction}', message)
+
+
+def tokenizer_filter_datum(
+    fields: List[str],
+    redaction: str,
+    message: str,
+    separator: str
+) -> str:
+    """
+    filter_datum going through the tokenizing engine.
+    """
+    return get_redactor(fields, redaction, separator, 'tokenizer')(message)
+
+
+def trie_filter_datum(
+    fields: List[str],
+    redaction: str,
+    message: str,
+    separator: str
+) -> str:
+    """
+    filter_datum going through the trie engine.
+    """
+    return get_redactor(fields, redaction, separator, 'trie')(message)
+
+
+def csv_rows(file_path: str = 'user_data.csv') -> List[Dict[str, str]]:
+    """
+    Reading the rows of user_data.csv.
+    """
+    with open(file_path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def make_case(
+    rows: List[Dict[str, str]],
+    field_count: int,
+    size: int,
+    separator: str,
+    hit_ratio: float,
+    rnd: random.Random
+) -> tuple:
+    """
+    Building the fields to redact and a synthetic log line.
+
+    The line holds the columns of a row of user_data.csv, then extra
+    columns up to field_count, with its user_agent padded to reach
+    about size characters. hit_ratio of the fields to redact appear
+    in the line, the others are names it does not hold.
+
+    Returns:
+    tuple: The fields to redact and the message.
+    """
+    row = rnd.choice(rows)
+    columns = [c for c in USER_COLUMNS if c != 'user_agent']
+    values = [row[c].replace(separator, ' ') for c in columns]
+    for i in range(len(columns), field_count):
+        columns.append('field_{}'.format(i))
+        values.append('value_{}'.format(i))
+    hits = round(field_count * hit_ratio)
+    fields = columns[:hits] + ['missing_{}'.format(i)
+                               for i in range(field_count - hits)]
+    pairs = ['{}={}'.format(c, v) for c, v in zip(columns, values)]
+    user_agent = 'user_agent={}'.format(
+        row['user_agent'].replace(separator, ' '))
+    length = len(separator.join(pairs)) + len(user_agent) + 2
+    pairs.append(user_agent + 'x' * max(size - length, 0))
+    return fields, separator.join(pairs) + separator
+
+
+def time_op(op: Callable[[], object], target_seconds: float = 0.05,
+            samples: int = 30) -> Dict[str, float]:
+    """
+    Timing op in samples batches, sized so that a run takes
+    about target_seconds.
+
+    Returns:
+    Dict[str, float]: ns/op (mean), p50, p90 and p99 of the batches.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            op()
+        elapsed = time.perf_counter() - started
+        if elapsed * samples >= target_seconds or number >= 1 << 20:
+            break
+        number *= 2
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            op()
+        timings.append((time.perf_counter_ns() - started) / number)
+    timings.sort()
+
+    def percentile(p: float) -> float:
+        return timings[min(int(p * len(timings)), len(timings) - 1)]
+
+    return {
+        'ns_per_op': sum(timings) / len(timings),
+        'p50_ns': percentile(0.50),
+        'p90_ns': percentile(0.90),
+        'p99_ns': percentile(0.99),
+    }
+
+
+def peak_alloc_per_op(op: Callable[[], object], number: int = 20) -> float:
+    """
+    Measuring the peak memory allocated while running op,
+    averaged over number runs, tracing each run on its own.
+
+    Returns:
+    float: Peak bytes allocated per op.
+    """
+    op()
+    total = 0
+    for _ in range(number):
+        tracemalloc.start()
+        try:
+            op()
+            total += tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return total / number
+
+
+def make_op(target: str, fields: List[str], message: str,
+            separator: str) -> Callable[[], object]:
+    """
+    Building the operation timed for a target.
+    """
+    if target == 'formatter':
+        formatter = RedactingFormatter(fields)
+        formatter._redactor = get_redactor(
+            fields, formatter.REDACTION, separator)
+        record = logging.LogRecord('user_data', logging.INFO, None, None,
+                                   message, None, None)
+        return lambda: formatter.format(record)
+    func = {
+        'legacy': legacy_filter_datum,
+        'filter_datum': filter_datum,
+        'tokenizer': tokenizer_filter_datum,
+        'trie': trie_filter_datum,
+    }[target]
+    return lambda: func(fields, '***', message, separator)
+
+
+def export_ns_per_row(rows: int, redact_columns: bool) -> float:
+    """
+    Timing filtered_logger.main on a SQLite users table of about rows rows,
+    with the log lines written to memory.
+
+    Returns:
+    - float: nanoseconds per exported row.
+    """
+    db_connection = get_sqlite_db(':memory:')
+    copies = max(rows // create_users_table(db_connection), 1)
+    rows = create_users_table(db_connection, copies=copies)
+    logging.getLogger('user_data').handlers.clear()
+    stderr, sys.stderr = sys.stderr, io.StringIO()
+    try:
+        started = time.perf_counter_ns()
+        filtered_logger.main(db_connection, redact_columns=redact_columns)
+        elapsed = time.perf_counter_ns() - started
+    finally:
+        sys.stderr = stderr
+        logging.getLogger('user_data').handlers.clear()
+    return elapsed / rows
+
+
+def run_suite(grid: Dict[str, Sequence], targets: Sequence[str],
+              seed: int = 0, export_rows: int = 100000) -> dict:
+    """
+    Running every case of the grid for each target.
+
+    Returns:
+    dict: The run metadata and one result per case.
+    """
+    rnd = random.Random(seed)
+    rows = csv_rows()
+    results = []
+    for field_count in grid['field_counts']:
+        for size in grid['sizes']:
+            for separator in grid['separators']:
+                for hit_ratio in grid['hit_ratios']:
+                    fields, message = make_case(rows, field_count, size,
+                                                separator, hit_ratio, rnd)
+                    expected = filter_datum(fields, '***', message,
+                                            separator)
+                    for target in targets:
+                        op = make_op(target, fields, message, separator)
+                        if target in ('legacy', 'tokenizer', 'trie'):
+                            assert op() == expected, target
+                        result = {
+                            'id': '{}/fields={}/size={}/sep={!r}/hit={}'
+                                  .format(target, field_count, size,
+                                          separator, hit_ratio),
+                            'target': target,
+                            'fields': field_count,
+                            'size': size,
+                            'message_bytes': len(message.encode()),
+                            'separator': separator,
+                            'hit_ratio': hit_ratio,
+                        }
+                        result.update(time_op(op))
+                        result['peak_alloc_bytes_per_op'] = \
+                            peak_alloc_per_op(op)
+                        results.append(result)
+                        print(result['id'], round(result['ns_per_op']),
+                              file=sys.stderr)
+    message = '; '.join('{}={}'.format(k, v) for k, v in rows[0].items())
+    for field_count in SCALING_FIELD_COUNTS:
+        fields = list(PII_FIELDS) + ['compliance_key_{}'.format(i) for i
+                                     in range(field_count - len(PII_FIELDS))]
+        for target, engine in (('filter_datum', 'regex'),
+                               ('tokenizer', 'tokenizer'), ('trie', 'trie')):
+            if target not in targets:
+                continue
+            # Redactors are built once, as RedactingFormatter does
+            op = functools.partial(
+                get_redactor(fields, '***', ';', engine), message)
+            result = {
+                'id': 'scaling/{}/fields={}'.format(target, field_count),
+                'target': target,
+                'fields': field_count,
+                'message_bytes': len(message.encode()),
+            }
+            result.update(time_op(op))
+            results.append(result)
+            print(result['id'], round(result['ns_per_op']), file=sys.stderr)
+    if export_rows:
+        for redact_columns in (False, True):
+            results.append({
+                'id': 'export/redact_columns={}'.format(redact_columns),
+                'target': 'export',
+                'ns_per_op': export_ns_per_row(export_rows, redact_columns),
+            })
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': seed,
+            'pii_fields': list(PII_FIELDS),
+        },
+        'results': results,
+    }
+
+
+def compare(old: dict, new: dict, threshold: float) -> List[dict]:
+    """
+    Comparing the median ns/op (the mean when the median is not
+    recorded) of the cases found in both runs.
+
+    Returns:
+    List[dict]: One entry per case, with its ratio new / old
+    and whether it is a regression (ratio above 1 + threshold).
+    """
+    old_results = {result['id']: result for result in old['results']}
+    report = []
+    for result in new['results']:
+        before = old_results.get(result['id'])
+        if before is None:
+            continue
+        old_ns = before.get('p50_ns', before['ns_per_op'])
+        new_ns = result.get('p50_ns', result['ns_per_op'])
+        ratio = new_ns / old_ns
+        report.append({
+            'id': result['id'],
+            'old_ns': old_ns,
+            'new_ns': new_ns,
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Command-line entry point.
+
+    Returns:
+    int: 1 when a comparison found regressions, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        description="Redaction benchmark suite")
+    parser.add_argument('-o', '--output', default='-',
+                        help="JSON results file, - for stdout")
+    parser.add_argument('--quick', action='store_true',
+                        help="run a reduced grid")
+    parser.add_argument('--targets',
+                        default='legacy,filter_datum,tokenizer,trie,'
+                                'formatter',
+                        help="comma-separated targets to time")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--export-rows', type=int, default=100000,
+                        help="rows of the export benchmark, 0 to skip")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two JSON results files")
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help="slowdown flagged as a regression (0.1: 10%%)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        report = compare(old, new, args.threshold)
+        for entry in report:
+            print('{:<60} {:>12.0f} {:>12.0f} {:>6.2f}x{}'.format(
+                entry['id'], entry['old_ns'], entry['new_ns'],
+                entry['ratio'], '  REGRESSION' if entry['regression'] else ''))
+        regressions = sum(entry['regression'] for entry in report)
+        print('{} cases compared, {} regressions'.format(
+            len(report), regressions))
+        return 1 if regressions else 0
+
+    grid = QUICK_GRID if args.quick else FULL_GRID
+    targets = [target for target in args.targets.split(',') if target]
+    results = run_suite(grid, targets, args.seed, args.export_rows)
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
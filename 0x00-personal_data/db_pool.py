@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Connection pool reusing database connections across get_db calls,
+with a pluggable driver so it can run against MySQL or SQLite.
+"""
+
+
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection was returned to the pool in time.
+    """
+
+
+class Driver:
+    """
+    Interface of the drivers the pool opens connections with.
+    """
+
+    def connect(self):
+        """
+        Opening a new connection.
+        """
+        raise NotImplementedError
+
+    def is_alive(self, connection) -> bool:
+        """
+        Checking that a pooled connection can still be used.
+        """
+        raise NotImplementedError
+
+    def reset(self, connection) -> None:
+        """
+        Cleaning a connection before it goes back to the pool.
+        """
+        connection.rollback()
+
+
+class MySQLDriver(Driver):
+    """
+    Driver opening mysql.connector connections.
+    """
+
+    def __init__(self, **connect_kwargs):
+        """
+        Initializing the driver.
+
+        Args:
+        - connect_kwargs: arguments of mysql.connector.connect.
+        """
+        self.connect_kwargs = connect_kwargs
+
+    def connect(self):
+        """
+        Opening a new MySQL connection.
+        """
+        import mysql.connector
+        return mysql.connector.connect(**self.connect_kwargs)
+
+    def is_alive(self, connection) -> bool:
+        """
+        Pinging the server, reconnecting once if needed.
+        """
+        try:
+            connection.ping(reconnect=True, attempts=1)
+            return True
+        except Exception:
+            return False
+
+
+class PooledConnection:
+    """
+    Connection checked out of a pool, closing it returns it to the pool.
+    Every other attribute is the one of the underlying connection.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', connection):
+        """
+        Wrapping a connection of the pool.
+        """
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name: str):
+        """
+        Delegating to the underlying connection.
+        """
+        if self._connection is None:
+            raise AttributeError("connection returned to the pool")
+        return getattr(self._connection, name)
+
+    def close(self) -> None:
+        """
+        Returning the connection to the pool.
+        """
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+    def __enter__(self) -> 'PooledConnection':
+        """
+        Using the connection as a context manager.
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Returning the connection to the pool.
+        """
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections.
+    """
+
+    def __init__(self, driver: Driver, size: int = 5,
+                 idle_timeout: float = 300, checkout_timeout: float = 30):
+        """
+        Initializing the pool, connections are opened on demand.
+
+        Args:
+        - driver (Driver): opens and checks the connections.
+        - size (int): maximum number of open connections.
+        - idle_timeout (float): seconds after which an unused connection
+        is closed instead of being handed out again.
+        - checkout_timeout (float): seconds to wait for a connection
+        when all of them are in use.
+        """
+        self.driver = driver
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque()
+        self._open = 0
+        self._condition = threading.Condition()
+        self._stats = {'checkouts': 0, 'creations': 0, 'waits': 0,
+                       'discarded': 0}
+
+    def _discard(self, connection) -> None:
+        """
+        Closing a connection that leaves the pool.
+        Called with the condition held.
+        """
+        self._open -= 1
+        self._stats['discarded'] += 1
+        self._condition.notify()
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _checkout(self, deadline: float):
+        """
+        Taking the most recently used idle connection,
+        or reserving room for a new one, waiting until deadline.
+
+        Returns:
+        The idle connection, or None when a new one must be opened.
+        """
+        with self._condition:
+            waited = False
+            while True:
+                while self._idle:
+                    connection, released_at = self._idle.pop()
+                    if time.monotonic() - released_at <= self.idle_timeout:
+                        return connection
+                    self._discard(connection)
+                if self._open < self.size:
+                    self._open += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout("no connection available in {}s"
+                                      .format(self.checkout_timeout))
+                if not waited:
+                    waited = True
+                    self._stats['waits'] += 1
+                self._condition.wait(remaining)
+
+    def connection(self) -> PooledConnection:
+        """
+        Checking a connection out of the pool,
+        opening one if none is idle and the pool is not full.
+        Idle connections are health-checked before being handed out.
+
+        Returns:
+        PooledConnection: The connection, closing it returns it.
+
+        Raises:
+        PoolTimeout: if no connection is available in checkout_timeout.
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._condition:
+            self._stats['checkouts'] += 1
+        while True:
+            connection = self._checkout(deadline)
+            if connection is None:
+                break
+            if self.driver.is_alive(connection):
+                return PooledConnection(self, connection)
+            with self._condition:
+                self._discard(connection)
+        try:
+            connection = self.driver.connect()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._stats['creations'] += 1
+        return PooledConnection(self, connection)
+
+    def release(self, connection) -> None:
+        """
+        Putting a connection back in the pool.
+        """
+        try:
+            self.driver.reset(connection)
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._condition:
+            if healthy:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._discard(connection)
+            self._condition.notify()
+
+    def close(self) -> None:
+        """
+        Closing the idle connections.
+        """
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Getting the pool statistics.
+
+        Returns:
+        Dict[str, int]: checkouts, creations, waits and discarded
+        connections so far, and the open and idle connections.
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+        return stats
@@ -5,11 +5,131 @@ Encrypting passwords using the bcrypt package
 
 
 import bcrypt
+import json
+import os
+import time
+from concurrent.futures import (FIRST_COMPLETED, Executor,
+                                ProcessPoolExecutor, ThreadPoolExecutor,
+                                wait)
+from itertools import count, islice
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+
+# File where calibrate() saves the work factor chosen for this host
+BCRYPT_CONFIG = os.getenv('PERSONAL_DATA_BCRYPT_CONFIG', '.bcrypt.json')
+DEFAULT_ROUNDS = 12
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+_rounds = None
+
+
+def get_rounds() -> int:
+    """
+    Getting the bcrypt work factor new hashes are made with:
+    the one saved in BCRYPT_CONFIG by calibrate(), else DEFAULT_ROUNDS.
+
+    Returns:
+    - int: The number of rounds (log2 of the iterations).
+    """
+    global _rounds
+    if _rounds is None:
+        try:
+            with open(BCRYPT_CONFIG) as f:
+                _rounds = int(json.load(f)['rounds'])
+        except (OSError, ValueError, KeyError, TypeError):
+            _rounds = DEFAULT_ROUNDS
+    return _rounds
+
+
+def _verify_seconds(rounds: int, samples: int = 3) -> float:
+    """
+    Measuring the fastest of samples checkpw calls
+    on a hash made with rounds rounds.
+    """
+    hashed = bcrypt.hashpw(b'calibration', bcrypt.gensalt(rounds))
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.checkpw(b'calibration', hashed)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def calibrate(target_ms: float = 50, save: bool = True) -> int:
+    """
+    Picking the highest work factor whose verify latency on this host
+    stays within target_ms, and saving it to BCRYPT_CONFIG.
+
+    Each extra round doubles the cost, so the latency measured at
+    MIN_ROUNDS is extrapolated, then the guess is checked and lowered
+    until it fits the target, or raised while the next round still
+    fits it when the extrapolation came out too low.
+
+    Args:
+    - target_ms (float): verify latency budget in milliseconds.
+    - save (bool): save the choice so get_rounds() uses it.
+
+    Returns:
+    - int: The chosen number of rounds.
+    """
+    global _rounds
+    base = _verify_seconds(MIN_ROUNDS) * 1000
+    rounds = MIN_ROUNDS
+    while rounds < MAX_ROUNDS and base * 2 ** (rounds + 1 - MIN_ROUNDS) \
+            <= target_ms:
+        rounds += 1
+    measured = _verify_seconds(rounds) * 1000
+    if measured > target_ms:
+        while rounds > MIN_ROUNDS and measured > target_ms:
+            rounds -= 1
+            measured = _verify_seconds(rounds) * 1000
+    else:
+        while rounds < MAX_ROUNDS:
+            higher = _verify_seconds(rounds + 1) * 1000
+            if higher > target_ms:
+                break
+            rounds += 1
+            measured = higher
+    if save:
+        with open(BCRYPT_CONFIG, 'w') as f:
+            json.dump({'rounds': rounds, 'target_ms': target_ms,
+                       'measured_ms': round(measured, 3)}, f)
+    _rounds = rounds
+    return rounds
+
+
+def hash_rounds(hashed_password: bytes) -> int:
+    """
+    Reading the work factor of a bcrypt hash ($2b$<rounds>$...).
+
+    Args:
+    - hashed_password (bytes): The hashed password.
+
+    Returns:
+    - int: The number of rounds it was made with.
+    """
+    return int(hashed_password.split(b'$')[2])
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    """
+    Checking if a hash was made with a lower work factor
+    than the current one. Stronger hashes are kept, so nodes
+    calibrated differently never weaken nor flip each other's hashes.
+
+    Args:
+    - hashed_password (bytes): The hashed password.
+
+    Returns:
+    - bool: True if the hash should be replaced.
+    """
+    return hash_rounds(hashed_password) < get_rounds()
 
 
 def hash_password(password: str) -> bytes:
     """
-    Hashing a password using bcrypt.
+    Hashing a password using bcrypt, with the work factor of get_rounds().
 
     Args:
     - password (str): The plain text password to be hashed.
@@ -17,7 +137,8 @@ def hash_password(password: str) -> bytes:
     Returns:
     - bytes: The hashed password as bytes.
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode('utf-8'),
+                         bcrypt.gensalt(get_rounds()))
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
@@ -34,3 +155,133 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     False otherwise.
     """
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+
+
+def verify_and_rehash(
+    hashed_password: bytes,
+    password: str
+) -> Tuple[bool, Optional[bytes]]:
+    """
+    Checking a password and, when it is valid but its hash was made
+    with an outdated work factor, hashing it again for the caller
+    to store.
+
+    Args:
+    - hashed_password (bytes): The hashed password to be validated.
+    - password (str): The plain text password to be checked.
+
+    Returns:
+    - Tuple[bool, Optional[bytes]]:
+    whether the password is valid, and the new hash to store
+    or None when the current one is up to date.
+    """
+    if not is_valid(hashed_password, password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, hash_password(password)
+    return True, None
+
+
+def _make_executor(workers: int = None, processes: bool = False) -> Executor:
+    """
+    Creating the pool the bulk APIs fan out to.
+    bcrypt releases the GIL while hashing, so threads use every core.
+
+    Args:
+    - workers (int): number of workers, defaults to the CPU count.
+    - processes (bool): use a process pool instead of threads.
+    """
+    workers = workers or os.cpu_count() or 1
+    if processes:
+        return ProcessPoolExecutor(workers)
+    return ThreadPoolExecutor(workers)
+
+
+def _run_many(func: Callable, args: Iterable[tuple], workers: int,
+              processes: bool, ordered: bool) -> Iterator:
+    """
+    Running func on each argument tuple in a pool,
+    yielding the results as they finish.
+    At most twice as many calls as workers are in flight: the next
+    arguments are only read as results are taken, and the calls not
+    started yet are cancelled when the caller stops early.
+    """
+    workers = workers or os.cpu_count() or 1
+    args = iter(args)
+    indexes = count()
+    pending = {}
+    executor = _make_executor(workers, processes)
+
+    def submit(number: int) -> None:
+        for arg in islice(args, number):
+            pending[executor.submit(func, *arg)] = next(indexes)
+
+    try:
+        submit(workers * 2)
+        while pending:
+            if ordered:
+                # The dict keeps the futures in submission order
+                done = [next(iter(pending))]
+                done[0].result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                submit(1)
+                if ordered:
+                    yield future.result()
+                else:
+                    yield index, future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def hash_many(
+    passwords: Iterable[str],
+    workers: int = None,
+    processes: bool = False,
+    ordered: bool = True
+) -> Iterator[bytes]:
+    """
+    Hashing many passwords in a thread (or process) pool.
+
+    Args:
+    - passwords (Iterable[str]): The plain text passwords to be hashed.
+    - workers (int): number of workers, defaults to the CPU count.
+    - processes (bool): use a process pool instead of threads.
+    - ordered (bool): yield the hashes in the order of the passwords,
+    each as soon as it and the ones before it are done. Otherwise
+    yield (index, hash) tuples in completion order.
+
+    Returns:
+    - Iterator[bytes]: The hashed passwords.
+    """
+    return _run_many(hash_password, ((password,) for password in passwords),
+                     workers, processes, ordered)
+
+
+def verify_many(
+    credentials: Iterable[Tuple[bytes, str]],
+    workers: int = None,
+    processes: bool = False,
+    ordered: bool = True
+) -> Iterator[bool]:
+    """
+    Checking many passwords against their hashes in a thread
+    (or process) pool.
+
+    Args:
+    - credentials (Iterable[Tuple[bytes, str]]):
+    (hashed_password, password) pairs, as taken by is_valid.
+    - workers (int): number of workers, defaults to the CPU count.
+    - processes (bool): use a process pool instead of threads.
+    - ordered (bool): yield the results in the order of the credentials,
+    each as soon as it and the ones before it are done. Otherwise
+    yield (index, result) tuples in completion order.
+
+    Returns:
+    - Iterator[bool]: Whether each password matches its hash.
+    """
+    return _run_many(is_valid, credentials, workers, processes, ordered)
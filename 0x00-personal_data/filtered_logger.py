@@ -10,10 +10,274 @@ and log it using a configured logger
 
 
 import os
+import copy
 import mysql.connector
-from typing import List
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, Sequence
 import re
 import logging
+import queue
+import threading
+from db_pool import ConnectionPool, MySQLDriver
+from log_queue import BatchingQueueListener, BoundedQueueHandler
+
+
+PII_FIELDS = ("name", "email", "phone", "ssn", "password")
+
+# Columns of the users table, in the order they are logged
+USER_COLUMNS = ("name", "email", "phone", "ssn", "password",
+                "ip", "last_login", "user_agent")
+
+# Number of distinct (fields, redaction, separator) sets kept compiled
+REDACTOR_CACHE_SIZE = 128
+
+# Rows fetched at once by the streaming export, 0 fetches them all at once
+EXPORT_BATCH_SIZE = int(os.getenv('PERSONAL_DATA_EXPORT_BATCH_SIZE', '0'))
+
+# Redacting the exported rows by column position instead of by regex
+EXPORT_REDACT_COLUMNS = os.getenv('PERSONAL_DATA_REDACT_COLUMNS', '') == '1'
+
+# Queued logging pipeline, a queue size of 0 logs on the caller's thread
+LOG_QUEUE_SIZE = int(os.getenv('PERSONAL_DATA_LOG_QUEUE_SIZE', '0'))
+LOG_OVERFLOW_POLICY = os.getenv('PERSONAL_DATA_LOG_OVERFLOW', 'block')
+LOG_BATCH_SIZE = int(os.getenv('PERSONAL_DATA_LOG_BATCH_SIZE', '100'))
+
+# Connection pool of get_db, a pool size of 0 opens a connection per call
+DB_POOL_SIZE = int(os.getenv('PERSONAL_DATA_DB_POOL_SIZE', '0'))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv('PERSONAL_DATA_DB_IDLE_TIMEOUT', '300'))
+DB_DRIVER = os.getenv('PERSONAL_DATA_DB_DRIVER', 'mysql')
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+class CompiledRedactor:
+    """
+    Redaction engine compiled once for a set of fields,
+    a redaction string and a separator.
+    """
+
+    def __init__(self, fields: Sequence[str], redaction: str, separator: str):
+        """
+        Compiling the substitution pattern for the given fields.
+
+        Args:
+        - fields (Sequence[str]): fields to obfuscate.
+        - redaction (str): string replacing the field values.
+        - separator (str): character separating the fields.
+        """
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self._pattern = re.compile(r'({})=[^\\{}]+'.format(
+            '|'.join(re.escape(field) for field in self.fields),
+            re.escape(separator)))
+        self._suffix = '={}'.format(redaction)
+
+    def _replace(self, match: re.Match) -> str:
+        """
+        Building the replacement of a matched field,
+        avoiding re-parsing a template string on every call.
+        """
+        return match.group(1) + self._suffix
+
+    def __call__(self, message: str) -> str:
+        """
+        Obfuscating the message, skipping the regex entirely
+        when it holds no '=' at all.
+
+        Args:
+        - message (str): the log line to obfuscate.
+
+        Returns:
+        - str: The obfuscated log message.
+        """
+        if '=' not in message:
+            return message
+        return self._pattern.sub(self._replace, message)
+
+
+class TokenizingRedactor:
+    """
+    Redaction engine scanning the message once from one '=' to the next
+    and looking the key in front of it up in a precomputed set,
+    instead of trying a regex alternation at every position.
+    Its output is the same as the one of CompiledRedactor.
+    """
+
+    def __init__(self, fields: Sequence[str], redaction: str, separator: str):
+        """
+        Precomputing the key set and the key lengths to try.
+
+        Args:
+        - fields (Sequence[str]): fields to obfuscate,
+        they can not be empty nor contain '='.
+        - redaction (str): string replacing the field values.
+        - separator (str): character separating the fields, each of
+        its characters ends a value when it is longer, as in the
+        character class of the regex.
+        """
+        if any(not field or '=' in field for field in fields):
+            raise ValueError("fields can not be empty nor contain '='")
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self._stops = tuple(sorted(set(separator)))
+        # Without fields the alternation of the regex is empty,
+        # so it matches in front of every '=': an empty key does too
+        self._keys = frozenset(self.fields or ('',))
+        # Longest keys first, as the regex keeps the leftmost match
+        self._lengths = sorted({len(field) for field in self._keys},
+                               reverse=True)
+        self._suffix = '={}'.format(redaction)
+
+    def __call__(self, message: str) -> str:
+        """
+        Obfuscating the message in a single pass.
+
+        Args:
+        - message (str): the log line to obfuscate.
+
+        Returns:
+        - str: The obfuscated log message.
+        """
+        stops = self._stops
+        key_start_of = self._key_start
+        size = len(message)
+        has_backslash = '\\' in message
+        output = []
+        start = 0
+        equal = message.find('=')
+        while equal != -1:
+            value = equal + 1
+            if value < size and message[value] not in stops and \
+                    message[value] != '\\':
+                key_start = key_start_of(message, equal, start)
+                if key_start != -1:
+                    end = size
+                    for stop in stops:
+                        found = message.find(stop, value, end)
+                        if found != -1:
+                            end = found
+                    if has_backslash:
+                        backslash = message.find('\\', value, end)
+                        if backslash != -1:
+                            end = backslash
+                    output.append(message[start:equal])
+                    output.append(self._suffix)
+                    start = end
+                    equal = message.find('=', end)
+                    continue
+            equal = message.find('=', value)
+        if not output:
+            return message
+        output.append(message[start:])
+        return ''.join(output)
+
+    def _key_start(self, message: str, equal: int, start: int) -> int:
+        """
+        Finding the longest key ending right before message[equal]
+        and starting at or after start.
+
+        Returns:
+        - int: The position of the key, -1 if there is none.
+        """
+        keys = self._keys
+        for length in self._lengths:
+            key_start = equal - length
+            if key_start >= start and message[key_start:equal] in keys:
+                return key_start
+        return -1
+
+
+class TrieRedactor(TokenizingRedactor):
+    """
+    Tokenizing engine matching the key in front of each '=' by walking
+    a trie of the reversed keys backwards from the '=', so the cost of
+    a lookup is bounded by the key length whatever the number of fields.
+    """
+
+    def __init__(self, fields: Sequence[str], redaction: str, separator: str):
+        """
+        Building the trie of the reversed keys.
+
+        Args:
+        - fields (Sequence[str]): fields to obfuscate,
+        they can not be empty nor contain '='.
+        - redaction (str): string replacing the field values.
+        - separator (str): character separating the fields.
+        """
+        super(TrieRedactor, self).__init__(fields, redaction, separator)
+        self._trie = {}
+        for field in self._keys:
+            node = self._trie
+            for char in reversed(field):
+                node = node.setdefault(char, {})
+            node[None] = len(field)
+
+    def _key_start(self, message: str, equal: int, start: int) -> int:
+        """
+        Finding the longest key ending right before message[equal]
+        and starting at or after start.
+
+        Returns:
+        - int: The position of the key, -1 if there is none.
+        """
+        node = self._trie
+        key_start = equal if None in node else -1
+        position = equal - 1
+        while position >= start:
+            node = node.get(message[position])
+            if node is None:
+                break
+            if None in node:
+                key_start = position
+            position -= 1
+        return key_start
+
+
+REDACTION_ENGINES = {
+    'regex': CompiledRedactor,
+    'tokenizer': TokenizingRedactor,
+    'trie': TrieRedactor,
+}
+
+
+@lru_cache(maxsize=REDACTOR_CACHE_SIZE)
+def _cached_redactor(fields: tuple, redaction: str, separator: str,
+                     engine: str) -> Callable[[str], str]:
+    """
+    Building the redactor of a hashable field set,
+    keeping the most recently used ones in a bounded cache.
+    """
+    return REDACTION_ENGINES[engine](fields, redaction, separator)
+
+
+def get_redactor(
+    fields: Sequence[str],
+    redaction: str,
+    separator: str,
+    engine: str = 'regex'
+) -> Callable[[str], str]:
+    """
+    Getting the compiled redactor for a set of fields.
+
+    Args:
+    - fields (Sequence[str]): fields to obfuscate.
+    - redaction (str): string replacing the field values.
+    - separator (str): character separating the fields.
+    - engine (str): name of the engine in REDACTION_ENGINES.
+
+    Returns:
+    - Callable[[str], str]: obfuscates the message it is given.
+
+    Raises:
+    - ValueError: if the engine is unknown.
+    """
+    if engine not in REDACTION_ENGINES:
+        raise ValueError("Unknown redaction engine: {}".format(engine))
+    return _cached_redactor(tuple(fields), redaction, separator, engine)
 
 
 def filter_datum(
@@ -38,9 +302,43 @@ def filter_datum(
     Returns:
     - str: The obfuscated log message.
     """
-    return re.sub(
-        fr'({separator.join(fields)})=[^\\{separator}]+',
-        rf'\1={redaction}', message)
+    return get_redactor(fields, redaction, separator)(message)
+
+
+class _KeyRecorder(dict):
+    """
+    Mapping recording the keys a %-format template looks up.
+    """
+
+    def __getitem__(self, key):
+        """
+        Recording the key, and giving a value every conversion accepts.
+        """
+        self.keys.append(key)
+        return 0
+
+
+@lru_cache(maxsize=REDACTOR_CACHE_SIZE)
+def template_keys(template: str) -> Optional[frozenset]:
+    """
+    Getting the keys of the %(key)s placeholders of a log message.
+
+    Args:
+    - template (str): the message of a log record.
+
+    Returns:
+    - Optional[frozenset]: The keys, None if the template has no
+    placeholder by key or can not be formatted with a mapping.
+    """
+    if '%(' not in template:
+        return None
+    recorder = _KeyRecorder()
+    recorder.keys = []
+    try:
+        template % recorder
+    except (TypeError, ValueError, KeyError):
+        return None
+    return frozenset(recorder.keys)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -50,7 +348,7 @@ class RedactingFormatter(logging.Formatter):
     FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
     SEPARATOR = ";"
 
-    def __init__(self, fields: List[str]):
+    def __init__(self, fields: List[str], engine: str = 'regex'):
         """
         Initializing the RedactingFormatter
         with the specified fields to redact.
@@ -58,28 +356,96 @@ class RedactingFormatter(logging.Formatter):
         Args:
         - fields (List[str]):
         list of strings representing fields to redact in log records.
+        - engine (str):
+        redaction engine to use, 'regex', 'tokenizer'
+        or 'trie' for long field lists.
         """
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self.engine = engine
+        self._fields = frozenset(fields)
+        self._redactor = get_redactor(
+            fields, self.REDACTION, self.SEPARATOR, engine)
+
+    def redact_mapping(self, data: Mapping) -> dict:
+        """
+        Redacting the fields of a structured record by key lookup.
+
+        Args:
+        - data (Mapping): the values of the record, by field name.
+
+        Returns:
+        - dict: A copy of data with the values of the fields redacted.
+        """
+        redacted = dict(data)
+        for field in self.fields:
+            if field in redacted:
+                redacted[field] = self.REDACTION
+        return redacted
 
     def format(self, record: logging.LogRecord) -> str:
         """
         Formatting the log record by redacting specified fields.
 
+        Structured records, whose args are a dict
+        (logger.info("name=%(name)s;", row)) or which carry one in
+        extra={'user_data': row} and have no positional args, get their
+        fields redacted by key before the message is rendered.
+        When every %(key)s placeholder of the message is a field,
+        no regex pass is needed, otherwise the rendered message still
+        goes through the redactor.
+        Records logged with extra={'redacted': True} are already redacted.
+
         Args:
         - record (logging.LogRecord): The log record to be formatted.
 
         Returns:
         - str: The formatted log message with specified fields redacted.
         """
+        data = record.args
+        if not data:
+            data = getattr(record, 'user_data', None)
+        if isinstance(data, Mapping):
+            template = str(record.msg)
+            keys = template_keys(template)
+            if keys is not None:
+                try:
+                    message = template % self.redact_mapping(data)
+                except (TypeError, ValueError, KeyError):
+                    pass
+                else:
+                    record = copy.copy(record)
+                    record.msg = message
+                    record.args = None
+                    log_message = super(RedactingFormatter, self).format(
+                        record=record)
+                    if keys <= self._fields or \
+                            getattr(record, 'redacted', False):
+                        return log_message
+                    return self._redactor(log_message)
         log_message = super(RedactingFormatter, self).format(record=record)
-        return filter_datum(self.fields, self.REDACTION, log, self.SEPARATOR)
+        if getattr(record, 'redacted', False):
+            return log_message
+        return self._redactor(log_message)
 
 
-def get_logger() -> logging.Logger:
+def get_logger(
+    queue_size: int = LOG_QUEUE_SIZE,
+    overflow: str = LOG_OVERFLOW_POLICY,
+    batch_size: int = LOG_BATCH_SIZE
+) -> logging.Logger:
     """
     Getting a configured logger for logging user data.
 
+    Args:
+    - queue_size (int):
+    when set, records are only enqueued in a queue of that size and a
+    background worker redacts, formats and writes them in batches.
+    - overflow (str):
+    policy of the queue when it is full, 'block', 'drop_oldest' or 'drop'.
+    - batch_size (int):
+    maximum number of records the worker writes at once.
+
     Returns:
     logging.Logger:
     The configured logger named "user_data" with specific settings.
@@ -95,6 +461,17 @@ def get_logger() -> logging.Logger:
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(RedactingFormatter(PII_FIELDS))
 
+    if queue_size > 0:
+        # Only enqueue on the caller's thread, the StreamHandler
+        # is driven by the worker, stopped when the handler is closed
+        record_queue = queue.Queue(queue_size)
+        queue_handler = BoundedQueueHandler(record_queue, overflow)
+        queue_handler.listener = BatchingQueueListener(
+            record_queue, [stream_handler], batch_size)
+        queue_handler.listener.start()
+        user_data_logger.addHandler(queue_handler)
+        return user_data_logger
+
     # Add the StreamHandler to the logger
     user_data_logger.addHandler(stream_handler)
 
@@ -104,57 +481,211 @@ def get_logger() -> logging.Logger:
 def get_db() -> mysql.connector.connection.MySQLConnection:
     """
     Establishing and creating connection to MySQL database
-    using environment variables
+    using environment variables.
+    When DB_POOL_SIZE is set, the connection comes from get_db_pool()
+    and closing it returns it to the pool.
 
     Returns:
     mysql.connector.connection.MySQLConnection:
     The database connection object.
     """
-    # Retrieving database credentials from environment variables
+    if DB_POOL_SIZE > 0:
+        return get_db_pool().connection()
+
+    # Creating a connection to the database
+    db_connection = mysql.connector.connect(**db_credentials())
+
+    return db_connection
+
+
+def db_credentials() -> dict:
+    """
+    Retrieving database credentials from environment variables.
+
+    Returns:
+    dict: The arguments of mysql.connector.connect.
+    """
     db_username = os.getenv('PERSONAL_DATA_DB_USERNAME', 'root')
     db_password = os.getenv('PERSONAL_DATA_DB_PASSWORD', '')
     db_host = os.getenv('PERSONAL_DATA_DB_HOST', 'localhost')
     db_name = os.getenv('PERSONAL_DATA_DB_NAME')
 
-    # Creating a connection to the database
-    db_connection = mysql.connector.connect(
-        user=db_username,
-        password=db_password,
-        host=db_host,
-        database=db_name
-    )
+    return {
+        'user': db_username,
+        'password': db_password,
+        'host': db_host,
+        'database': db_name,
+    }
 
-    return db_connection
 
+def get_db_pool() -> ConnectionPool:
+    """
+    Getting the connection pool shared by the get_db calls,
+    creating it on first use with the DB_DRIVER driver,
+    'mysql' or the local 'sqlite' stand-in.
+
+    Returns:
+    ConnectionPool: The pool, see its stats() for its statistics.
+    """
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            if DB_DRIVER == 'sqlite':
+                from sqlite_users import SQLiteDriver
+                driver = SQLiteDriver()
+            else:
+                driver = MySQLDriver(**db_credentials())
+            _db_pool = ConnectionPool(driver, max(DB_POOL_SIZE, 1),
+                                      DB_POOL_IDLE_TIMEOUT)
+        return _db_pool
+
+
+class PositionalRedactor:
+    """
+    Redacting the values of a database row by column position,
+    before the row is formatted into a key=value log line.
+    """
+
+    def __init__(self, columns: Sequence[str], fields: Sequence[str],
+                 redaction: str, separator: str):
+        """
+        Finding the positions of the fields in the columns.
+
+        Args:
+        - columns (Sequence[str]): column names, in the order of the row.
+        - fields (Sequence[str]): fields to obfuscate.
+        - redaction (str): string replacing the field values.
+        - separator (str): character separating the fields in the log line.
+        """
+        self.positions = tuple(i for i, column in enumerate(columns)
+                               if column in fields)
+        self.redaction = redaction
+        self.separator = separator
+
+    def __call__(self, row: Sequence) -> Optional[List[str]]:
+        """
+        Redacting a row.
+
+        Args:
+        - row (Sequence): the values of the row.
+
+        Returns:
+        - List[str]: The values as strings with the fields redacted,
+        or None when a value would make the line redact differently
+        than filter_datum does (a value holding '=', or a field value
+        that is empty or holds the separator or a backslash).
+        """
+        values = ['{}'.format(value) for value in row]
+        for value in values:
+            if '=' in value:
+                return None
+        for position in self.positions:
+            value = values[position]
+            if not value or self.separator in value or '\\' in value:
+                return None
+            values[position] = self.redaction
+        return values
+
+
+def iter_rows(cursor, batch_size: int) -> Iterator[tuple]:
+    """
+    Yielding the rows of an executed cursor,
+    fetching batch_size rows at a time.
+
+    Args:
+    - cursor: cursor on which a query was executed.
+    - batch_size (int): number of rows to fetch at once.
+
+    Yields:
+    tuple: The rows of the query result.
+    """
+    rows = cursor.fetchmany(batch_size)
+    while rows:
+        yield from rows
+        rows = cursor.fetchmany(batch_size)
+
+
+def unbuffered_cursor(db_connection):
+    """
+    Creating a cursor reading the rows from the server as they are
+    fetched rather than loading the whole result set when executing.
+
+    Args:
+    - db_connection: MySQL connection, or its sqlite3 stand-in
+    whose cursors never buffer the result set.
 
-def main() -> None:
+    Returns:
+    The cursor.
+    """
+    try:
+        return db_connection.cursor(buffered=False)
+    except TypeError:
+        return db_connection.cursor()
+
+
+def main(
+    db_connection=None,
+    batch_size: Optional[int] = None,
+    redact_columns: Optional[bool] = None
+) -> None:
     """
     Retrieve user data from the database
     and log it using a configured logger.
+
+    Args:
+    - db_connection: connection to read the users table from,
+    defaults to get_db().
+    - batch_size (int): when set, rows are streamed through an
+    unbuffered cursor batch_size at a time instead of being all
+    fetched before logging, defaults to EXPORT_BATCH_SIZE.
+    - redact_columns (bool): when set, the PII columns are redacted
+    by position before formatting, skipping the regex pass,
+    defaults to EXPORT_REDACT_COLUMNS.
     """
+    if batch_size is None:
+        batch_size = EXPORT_BATCH_SIZE
+    if redact_columns is None:
+        redact_columns = EXPORT_REDACT_COLUMNS
+    redact_row = None
+    if redact_columns:
+        redact_row = PositionalRedactor(
+            USER_COLUMNS, PII_FIELDS,
+            RedactingFormatter.REDACTION, RedactingFormatter.SEPARATOR)
+
     # Establish a database connection
-    db_connection = get_db()
+    if db_connection is None:
+        db_connection = get_db()
 
     # Initialize a logger
     user_data_logger = get_logger()
 
     # Create a cursor to interact with the database
-    cursor = db_connection.cursor()
+    if batch_size > 0:
+        cursor = unbuffered_cursor(db_connection)
+    else:
+        cursor = db_connection.cursor()
 
     # Execute the SQL query to retrieve user data
     cursor.execute("SELECT * FROM users")
 
-    # Fetch all rows from the query result
-    rows = cursor.fetchall()
+    # Fetch the rows, all at once or batch by batch
+    if batch_size > 0:
+        rows = iter_rows(cursor, batch_size)
+    else:
+        rows = cursor.fetchall()
 
     # Process and log each row
     for row in rows:
+        redacted = redact_row(row) if redact_row else None
+        if redacted is not None:
+            row = redacted
         user_data_entry = (
             "name={}; email={}; phone={}; ssn={}; "
             "password={}; ip={}; last_login={}; user_agent={};"
         ).format(
             row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7])
-        user_data_logger.info(user_data_entry)
+        user_data_logger.info(user_data_entry,
+                              extra={'redacted': redacted is not None})
 
     # Close the cursor and the database connection
     cursor.close()
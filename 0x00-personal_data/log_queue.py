@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Non-blocking logging pipeline:
+callers only enqueue their LogRecord in a bounded queue,
+a background worker formats and writes them in batches.
+"""
+
+
+import copy
+import logging
+import queue
+import threading
+from collections.abc import Mapping
+from typing import List
+
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop')
+
+# Containers the caller may still change after logging them
+MUTABLE_TYPES = (dict, list, set, bytearray)
+
+
+class BoundedQueueHandler(logging.Handler):
+    """
+    Handler putting the records in a bounded queue,
+    without formatting them on the caller's thread.
+    """
+
+    def __init__(self, record_queue: queue.Queue, overflow: str = 'block'):
+        """
+        Initializing the handler.
+
+        Args:
+        - record_queue (queue.Queue): bounded queue read by the worker.
+        - overflow (str): what to do when the queue is full,
+        'block' waits for room, 'drop_oldest' discards the oldest
+        queued record and 'drop' discards the new one.
+        Discarded records are counted in dropped.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy: {}".format(overflow))
+        super(BoundedQueueHandler, self).__init__()
+        self.queue = record_queue
+        self.overflow = overflow
+        self.dropped = 0
+        self.listener = None
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Putting the record in the queue following the overflow policy.
+
+        Args:
+        - record (logging.LogRecord): The record to enqueue.
+        """
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                self.dropped += 1
+                if self.overflow == 'drop':
+                    return
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                self.dropped -= 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Snapshotting the record before it is queued: the args and extra
+        attributes holding mutable containers are shallow copied,
+        so the worker formats the values they held when logged
+        rather than the ones the caller changed them to since.
+
+        Args:
+        - record (logging.LogRecord): The record to snapshot.
+
+        Returns:
+        - logging.LogRecord: A copy of the record.
+        """
+        record = copy.copy(record)
+        args = record.args
+        if isinstance(args, Mapping):
+            record.args = dict(args)
+        elif isinstance(args, tuple):
+            record.args = tuple(
+                copy.copy(arg) if isinstance(arg, MUTABLE_TYPES) else arg
+                for arg in args)
+        for name, value in record.__dict__.items():
+            if name != 'args' and isinstance(value, MUTABLE_TYPES):
+                record.__dict__[name] = copy.copy(value)
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Enqueuing a snapshot of the record, the worker does the formatting.
+
+        Args:
+        - record (logging.LogRecord): The record to log.
+        """
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        """
+        Stopping the worker, which flushes the queued records first.
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        super(BoundedQueueHandler, self).close()
+
+
+class BatchingQueueListener:
+    """
+    Worker thread taking the records off the queue batch by batch
+    and writing each batch to its handlers with a single flush.
+    """
+
+    _sentinel = None
+
+    def __init__(self, record_queue: queue.Queue,
+                 handlers: List[logging.Handler], batch_size: int = 100):
+        """
+        Initializing the listener.
+
+        Args:
+        - record_queue (queue.Queue): queue filled by the handler.
+        - handlers (List[logging.Handler]): handlers writing the records.
+        - batch_size (int): maximum number of records handled at once.
+        """
+        self.queue = record_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Starting the worker thread.
+        """
+        self._thread = threading.Thread(target=self._monitor, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Asking the worker to stop once the queued records are written,
+        and waiting for it.
+        """
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+
+    def _next_batch(self) -> List[logging.LogRecord]:
+        """
+        Waiting for a record, then taking the ones already queued
+        behind it, up to batch_size.
+        """
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size and \
+                batch[-1] is not self._sentinel:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def handle(self, batch: List[logging.LogRecord]) -> None:
+        """
+        Writing a batch of records to each handler.
+        Stream handlers get the whole batch in one write and flush.
+
+        Args:
+        - batch (List[logging.LogRecord]): The records to write.
+        """
+        for handler in self.handlers:
+            records = [record for record in batch
+                       if record.levelno >= handler.level
+                       and handler.filter(record)]
+            if not records:
+                continue
+            if not isinstance(handler, logging.StreamHandler):
+                for record in records:
+                    handler.handle(record)
+                continue
+            lines = []
+            for record in records:
+                try:
+                    lines.append(handler.format(record) + handler.terminator)
+                except Exception:
+                    handler.handleError(record)
+            handler.acquire()
+            try:
+                handler.stream.write(''.join(lines))
+                handler.flush()
+            except Exception:
+                handler.handleError(records[-1])
+            finally:
+                handler.release()
+
+    def _monitor(self) -> None:
+        """
+        Handling the batches until the sentinel is dequeued.
+        """
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is self._sentinel
+            if stop:
+                batch.pop()
+            if batch:
+                self.handle(batch)
+            if stop:
+                return
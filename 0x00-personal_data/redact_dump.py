@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Redacting large user_data.csv-style dumps in parallel:
+the input is memory-mapped, split into line-aligned chunks,
+the chunks are redacted in a process pool
+and written back in their original order.
+
+Usage: ./redact_dump.py input.csv output.csv [-w WORKERS] [-c CHUNK_MB]
+"""
+
+
+import argparse
+import csv
+import io
+import mmap
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Iterator, List, Sequence, Tuple
+from filtered_logger import PII_FIELDS, RedactingFormatter, get_redactor
+
+
+def chunk_bounds(data: mmap.mmap, start: int,
+                 chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Splitting data[start:] into chunks of about chunk_size bytes,
+    each ending right after a newline.
+
+    Args:
+    - data (mmap.mmap): the memory-mapped input.
+    - start (int): offset of the first chunk.
+    - chunk_size (int): approximate size of a chunk in bytes.
+
+    Yields:
+    Tuple[int, int]: The start and end offsets of each chunk.
+    """
+    size = len(data)
+    while start < size:
+        end = data.find(b'\n', min(start + chunk_size, size) - 1)
+        end = size if end == -1 else end + 1
+        yield start, end
+        start = end
+
+
+def redact_csv(text: str, columns: Sequence[int], redaction: str) -> str:
+    """
+    Redacting the given columns of CSV rows,
+    writing them back with every value quoted.
+
+    Args:
+    - text (str): CSV rows, without header.
+    - columns (Sequence[int]): positions of the columns to redact.
+    - redaction (str): string replacing the values.
+
+    Returns:
+    str: The redacted rows.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, quoting=csv.QUOTE_ALL, lineterminator='\n')
+    for row in csv.reader(io.StringIO(text)):
+        for column in columns:
+            if column < len(row):
+                row[column] = redaction
+        writer.writerow(row)
+    return output.getvalue()
+
+
+def redact_lines(text: str, fields: Sequence[str], redaction: str) -> str:
+    """
+    Redacting key=value log lines with filtered_logger's engine.
+
+    Args:
+    - text (str): log lines.
+    - fields (Sequence[str]): fields to obfuscate.
+    - redaction (str): string replacing the values.
+
+    Returns:
+    str: The redacted lines.
+    """
+    redactor = get_redactor(fields, redaction, RedactingFormatter.SEPARATOR)
+    return ''.join(redactor(line) for line in text.splitlines(True))
+
+
+def redact_chunk(task: tuple) -> bytes:
+    """
+    Redacting one chunk of the input, run in the worker processes.
+
+    Args:
+    - task (tuple): input path, start and end offsets, mode,
+    columns or fields to redact and redaction string.
+
+    Returns:
+    bytes: The redacted chunk.
+    """
+    path, start, end, mode, targets, redaction = task
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode('utf-8')
+    if mode == 'csv':
+        return redact_csv(text, targets, redaction).encode('utf-8')
+    return redact_lines(text, targets, redaction).encode('utf-8')
+
+
+def redact_file(
+    input_path: str,
+    output,
+    fields: Sequence[str] = PII_FIELDS,
+    redaction: str = RedactingFormatter.REDACTION,
+    mode: str = 'csv',
+    workers: int = None,
+    chunk_size: int = 8 << 20
+) -> int:
+    """
+    Redacting a dump into output, chunk by chunk in a process pool.
+
+    Args:
+    - input_path (str): the dump to redact.
+    - output: binary file object receiving the redacted dump.
+    - fields (Sequence[str]): fields to obfuscate.
+    - redaction (str): string replacing the values.
+    - mode (str): 'csv' for a dump with a header row naming the
+    columns, 'kv' for key=value log lines.
+    - workers (int): number of processes, defaults to the CPU count.
+    - chunk_size (int): approximate size of a chunk in bytes.
+
+    Returns:
+    int: The number of bytes read.
+    """
+    with open(input_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            targets = list(fields)
+            if mode == 'csv':
+                start = data.find(b'\n') + 1 or len(data)
+                header = data[:start]
+                output.write(header)
+                columns = next(csv.reader([header.decode('utf-8')]), [])
+                targets = [i for i, name in enumerate(columns)
+                           if name in fields]
+            tasks = [(input_path, chunk_start, chunk_end, mode, targets,
+                      redaction)
+                     for chunk_start, chunk_end in
+                     chunk_bounds(data, start, chunk_size)]
+            size = len(data)
+    with Pool(workers) as pool:
+        for chunk in pool.imap(redact_chunk, tasks):
+            output.write(chunk)
+    return size
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Command-line entry point, reporting the throughput on stderr.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('input', help="dump to redact")
+    parser.add_argument('output', help="redacted dump, - for stdout")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of processes (default: CPU count)")
+    parser.add_argument('-c', '--chunk-mb', type=float, default=8,
+                        help="chunk size in MB (default: 8)")
+    parser.add_argument('-f', '--fields', default=','.join(PII_FIELDS),
+                        help="comma-separated fields to redact")
+    parser.add_argument('--kv', action='store_true',
+                        help="input is key=value log lines, not CSV")
+    args = parser.parse_args(argv)
+
+    fields = [field for field in args.fields.split(',') if field]
+    chunk_size = max(int(args.chunk_mb * (1 << 20)), 1)
+    started = time.perf_counter()
+    if args.output == '-':
+        size = redact_file(args.input, sys.stdout.buffer, fields,
+                           mode='kv' if args.kv else 'csv',
+                           workers=args.workers, chunk_size=chunk_size)
+    else:
+        with open(args.output, 'wb') as output:
+            size = redact_file(args.input, output, fields,
+                               mode='kv' if args.kv else 'csv',
+                               workers=args.workers, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - started
+    print("{:.1f} MB in {:.2f}s: {:.1f} MB/s".format(
+        size / 1e6, elapsed, size / 1e6 / elapsed if elapsed else 0),
+        file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
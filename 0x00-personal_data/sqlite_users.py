@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Local SQLite stand-in for the MySQL users database,
+used to run filtered_logger without a MySQL server.
+"""
+
+
+import csv
+import os
+import sqlite3
+from db_pool import Driver
+from filtered_logger import USER_COLUMNS
+
+
+def get_sqlite_db(database: str = None) -> sqlite3.Connection:
+    """
+    Connecting to the SQLite database standing in for get_db.
+
+    Args:
+    - database (str): path of the database file,
+    defaults to PERSONAL_DATA_DB_NAME or an in-memory database.
+
+    Returns:
+    sqlite3.Connection: The database connection object.
+    """
+    if database is None:
+        database = os.getenv('PERSONAL_DATA_DB_NAME') or ':memory:'
+    return sqlite3.connect(database, check_same_thread=False)
+
+
+def create_users_table(
+    db_connection: sqlite3.Connection,
+    csv_path: str = 'user_data.csv',
+    copies: int = 1
+) -> int:
+    """
+    Creating the users table and filling it with the rows of a CSV dump.
+
+    Args:
+    - db_connection (sqlite3.Connection): the database to fill.
+    - csv_path (str): CSV file with a header row naming USER_COLUMNS.
+    - copies (int): number of times the rows are inserted,
+    to build tables larger than the dump.
+
+    Returns:
+    int: The number of rows inserted.
+    """
+    db_connection.execute("DROP TABLE IF EXISTS users")
+    db_connection.execute("CREATE TABLE users ({})".format(
+        ", ".join("{} TEXT".format(column) for column in USER_COLUMNS)))
+    with open(csv_path, newline='') as f:
+        rows = [tuple(row[column] for column in USER_COLUMNS)
+                for row in csv.DictReader(f)]
+    query = "INSERT INTO users VALUES ({})".format(
+        ", ".join("?" * len(USER_COLUMNS)))
+    for _ in range(copies):
+        db_connection.executemany(query, rows)
+    db_connection.commit()
+    return len(rows) * copies
+
+
+class SQLiteDriver(Driver):
+    """
+    Connection pool driver opening SQLite connections.
+    """
+
+    def __init__(self, database: str = None):
+        """
+        Initializing the driver.
+
+        Args:
+        - database (str): path of the database file,
+        see get_sqlite_db.
+        """
+        self.database = database
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Opening a new SQLite connection.
+        """
+        return get_sqlite_db(self.database)
+
+    def is_alive(self, connection: sqlite3.Connection) -> bool:
+        """
+        Running a trivial query on the connection.
+        """
+        try:
+            connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
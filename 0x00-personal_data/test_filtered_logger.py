@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Tests of the redaction engines, the tokenizing and trie engines
+giving byte for byte the output of filter_datum, and of the
+RedactingFormatter.
+"""
+
+
+import logging
+import random
+import unittest
+
+from filtered_logger import (PII_FIELDS, REDACTION_ENGINES,
+                             RedactingFormatter, TrieRedactor,
+                             TokenizingRedactor, filter_datum, get_redactor)
+
+
+# Seeded fuzz: messages and fields drawn from a small alphabet, so keys,
+# '=', separators and backslashes collide often
+FUZZ_SEED = 0
+FUZZ_CASES = 5000
+FUZZ_ALPHABET = ['=', ';', ' ', ',', '\\', '.', 'a', 'b', 'n', 's',
+                 'name', 'ssn', 'email', 'pass']
+FUZZ_SEPARATORS = [';', ',', ' ', '; ', ';,', '.', '\\', '']
+
+CASES = [
+    (list(PII_FIELDS), ';',
+     "name=egg;email=eggmin@eggsample.com;password=eggcellent;"
+     "date_of_birth=12/12/1986;"),
+    (list(PII_FIELDS), ';',
+     "name=Bob;email=bob@dylan.com;ssn=000-123-0000;"
+     "password=bobby2019;ip=192.168.0.1;"),
+    (list(PII_FIELDS), ';', "no fields here"),
+    (list(PII_FIELDS), ';', ""),
+    (list(PII_FIELDS), ';', "name=;email==x;ssn=a\\b;phone=\\c;"),
+    (list(PII_FIELDS), ';', "username=bob;surname=x;emailname=y;"),
+    (list(PII_FIELDS), ';', "name=a=b;name=name=c;"),
+    (['name', 'namename', 'e'], ';', "namename=x;ename=y;e=z;=name=w"),
+    (['ssn', 'name'], '; ', "ab;;=ssn=ssn ==namename.."),
+    (['ssn', 'name'], '; ', "name=Bob Dylan; ssn=000; other=x"),
+    (['ssn', 'name'], ';,', "name=a,b;ssn=c;,d"),
+    (['a.b', 'c+'], ';', "a.b=1;axb=2;c+=3;cc=4;"),
+    (list(PII_FIELDS), '', "name=a;b\\c"),
+    ([], ';', "name=bob;email=a@b;"),
+    ([], ';', "=x;a==b;c=;\\=d"),
+    (list(PII_FIELDS), '\\', "name=a\\email=b\\"),
+]
+
+
+class TestEngines(unittest.TestCase):
+    """Tests of the redaction engines against filter_datum
+    """
+
+    def assertSameOutput(self, fields: list, separator: str,
+                         message: str) -> None:
+        """Assert every engine redacts the message as filter_datum
+        """
+        expected = filter_datum(fields, '***', message, separator)
+        for engine in REDACTION_ENGINES:
+            with self.subTest(engine=engine, fields=fields,
+                              separator=separator, message=message):
+                redactor = get_redactor(fields, '***', separator, engine)
+                self.assertEqual(redactor(message), expected)
+
+    def test_cases(self):
+        """Hand-written cases
+        """
+        for fields, separator, message in CASES:
+            self.assertSameOutput(fields, separator, message)
+
+    def test_multi_character_separator(self):
+        """Each character of a longer separator ends a value
+        """
+        self.assertEqual(
+            TokenizingRedactor(['ssn', 'name'], '***', '; ')(
+                'ab;;=ssn=ssn ==namename..'),
+            'ab;;=ssn=*** ==namename..')
+
+    def test_fuzz(self):
+        """Random messages, fields and separators
+        """
+        rnd = random.Random(FUZZ_SEED)
+        for _ in range(FUZZ_CASES):
+            fields = list({
+                ''.join(rnd.choice(FUZZ_ALPHABET[5:])
+                        for _ in range(rnd.randint(1, 3)))
+                for _ in range(rnd.randint(1, 4))})
+            separator = rnd.choice(FUZZ_SEPARATORS)
+            message = ''.join(rnd.choice(FUZZ_ALPHABET + fields)
+                              for _ in range(rnd.randint(0, 30)))
+            self.assertSameOutput(fields, separator, message)
+
+    def test_invalid_fields(self):
+        """Empty fields and fields holding '=' are rejected
+        """
+        for engine in (TokenizingRedactor, TrieRedactor):
+            for fields in ([''], ['name', 'a=b']):
+                with self.subTest(engine=engine, fields=fields):
+                    with self.assertRaises(ValueError):
+                        engine(fields, '***', ';')
+
+    def test_unknown_engine(self):
+        """get_redactor rejects unknown engines
+        """
+        with self.assertRaises(ValueError):
+            get_redactor(PII_FIELDS, '***', ';', 'unknown')
+
+
+class TestRedactingFormatter(unittest.TestCase):
+    """Tests of the structured and positional paths of the formatter
+    """
+
+    row = {'name': 'Bob', 'email': 'bob@dylan.com', 'ip': '1.1.1.1'}
+
+    def render(self, msg: str, args, **extra) -> str:
+        """Format a record, returning the part after the prefix
+        """
+        record = logging.LogRecord('user_data', logging.INFO, __file__, 0,
+                                   msg, args, None)
+        record.__dict__.update(extra)
+        formatted = RedactingFormatter(list(PII_FIELDS)).format(record)
+        return formatted.split(': ', 1)[1]
+
+    def test_mapping_args(self):
+        """Dict args are redacted by key
+        """
+        self.assertEqual(
+            self.render("name=%(name)s;ip=%(ip)s;", (self.row,)),
+            "name=***;ip=1.1.1.1;")
+
+    def test_user_data(self):
+        """extra={'user_data': row} without args is redacted by key
+        """
+        self.assertEqual(
+            self.render("name=%(name)s;ip=%(ip)s;", (),
+                        user_data=self.row),
+            "name=***;ip=1.1.1.1;")
+
+    def test_user_data_with_positional_args(self):
+        """Positional args win over user_data, then get redacted
+        """
+        self.assertEqual(
+            self.render("user %s;email=%s;", ("x", "bob@dylan.com"),
+                        user_data=self.row),
+            "user x;email=***;")
+
+    def test_mapping_args_other_keys(self):
+        """Values under keys that aren't fields still get redacted
+        """
+        self.assertEqual(self.render("name=%(full)s;", ({'full': 'Bob'},)),
+                         "name=***;")
+        self.assertEqual(
+            self.render("%(line)s", ({'line': 'name=Bob;email=b@x;'},)),
+            "name=***;email=***;")
+
+    def test_user_data_literal_percent(self):
+        """A message without placeholders is logged as it is
+        """
+        self.assertEqual(self.render("50% done", (), user_data=self.row),
+                         "50% done")
+        self.assertEqual(self.render("%(nope)s 50% done", (),
+                                     user_data=self.row),
+                         "%(nope)s 50% done")
+
+    def test_plain_message(self):
+        """Messages without structured data go through the redactor
+        """
+        self.assertEqual(self.render("name=Bob;ip=1.1.1.1;", ()),
+                         "name=***;ip=1.1.1.1;")
+
+
+if __name__ == '__main__':
+    unittest.main()
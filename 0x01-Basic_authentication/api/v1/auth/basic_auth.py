@@ -6,14 +6,109 @@ a BasicAuth class that inherits from Auth
 
 from api.v1.auth.auth import Auth
 import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Tuple, TypeVar
 from api.v1.views.users import User
 
 
+class CredentialCache:
+    """
+    Bounded LRU cache, with a time to live, of the Authorization
+    headers already verified, mapped to the id of their user.
+
+    Headers are keyed by an HMAC under a per-process key, so the
+    cache never holds credentials. A hit is only used while the user
+    still exists with the email and password it was verified with,
+    so saving a new password or removing the user invalidates it.
+    """
+    def __init__(self, size: int = 1024, ttl: float = 300):
+        """
+        Initializing the cache.
+
+        Args:
+            size (int): maximum number of entries.
+            ttl (float): seconds an entry stays valid.
+        """
+        self.size = size
+        self.ttl = ttl
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, authorization_header: str) -> bytes:
+        """
+        Keyed hash of an Authorization header.
+        """
+        return hmac.new(self._key, authorization_header.encode('utf-8'),
+                        hashlib.sha256).digest()
+
+    def get(self, authorization_header: str) -> TypeVar('User'):
+        """
+        Getting the user a header was verified for.
+
+        Args:
+            authorization_header (str): the raw Authorization header.
+
+        Returns:
+            User:
+                The user, or None if the header is not cached,
+                expired, or its user was removed or changed
+                its email or password since.
+        """
+        digest = self._digest(authorization_header)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            user_id, email, password, expires = entry
+            if expires < time.monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+        user = User.get(user_id)
+        if user is None or user.email != email or user.password != password:
+            with self._lock:
+                self._entries.pop(digest, None)
+            return None
+        return user
+
+    def put(self, authorization_header: str, user: TypeVar('User')) -> None:
+        """
+        Caching the user a header was verified for.
+
+        Args:
+            authorization_header (str): the raw Authorization header.
+            user (User): the user its credentials match.
+        """
+        digest = self._digest(authorization_header)
+        entry = (user.id, user.email, user.password,
+                 time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
 class BasicAuth(Auth):
     """
     a BasicAuth class that inherits from Auth
     """
+    def __init__(self):
+        """
+        Initializing the cache of the verified credentials,
+        sized by BASIC_AUTH_CACHE_SIZE (0 disables it)
+        and expiring after BASIC_AUTH_CACHE_TTL seconds.
+        """
+        size = int(os.getenv('BASIC_AUTH_CACHE_SIZE', '1024'))
+        ttl = float(os.getenv('BASIC_AUTH_CACHE_TTL', '300'))
+        self.credential_cache = CredentialCache(size, ttl) if size else None
+
     def extract_base64_authorization_header(
         self,
         authorization_header: str
@@ -159,6 +254,13 @@ class BasicAuth(Auth):
         if not auth_header:
             return None
 
+        # Skipping the verification of credentials already verified.
+        cache = self.credential_cache
+        if cache is not None:
+            user = cache.get(auth_header)
+            if user is not None:
+                return user
+
         # Extract the Base64 part of the authorization header.
         base64_encoded = self.extract_base64_authorization_header(auth_header)
 
@@ -174,4 +276,7 @@ class BasicAuth(Auth):
         # Get the User instance based on the email and password.
         user = self.user_object_from_credentials(email, password)
 
+        if user is not None and cache is not None:
+            cache.put(auth_header, user)
+
         return user
@@ -2,18 +2,101 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request, url_for
 from models.user import User
+from os import getenv
+from typing import Iterable, Iterator
+
+
+USERS_PAGE_MAX = int(getenv('USERS_PAGE_MAX', '1000'))
+USERS_STREAM_PAGE = 100
+
+
+def _user_response(user: User, status: int = 200) -> Response:
+    """ Response of a User object JSON represented, from its cached
+    encoding
+    """
+    return Response(user.json_bytes() + b'\n', status,
+                    mimetype='application/json')
+
+
+def _users_response(users: Iterable[User]) -> Response:
+    """ Response of a list of User objects JSON represented, from their
+    cached encoding
+    """
+    body = b','.join([user.json_bytes() for user in users])
+    return Response(b'[' + body + b']\n', mimetype='application/json')
+
+
+def _stream_users(after: str, limit: int, ndjson: bool) -> Iterator[bytes]:
+    """ Serialize the users ordered by ID, USERS_STREAM_PAGE at a time,
+    as a JSON array or one JSON object per line
+    """
+    if not ndjson:
+        yield b'['
+    first = True
+    while limit is None or limit > 0:
+        size = USERS_STREAM_PAGE if limit is None \
+            else min(USERS_STREAM_PAGE, limit)
+        users = User.page(after, size)
+        if len(users) == 0:
+            break
+        bodies = [user.json_bytes() for user in users]
+        if ndjson:
+            yield b'\n'.join(bodies) + b'\n'
+        else:
+            yield (b',' if not first else b'') + b','.join(bodies)
+        first = False
+        after = users[-1].id
+        if limit is not None:
+            limit -= len(users)
+    if not ndjson:
+        yield b']\n'
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (optional):
+      - limit: maximum number of users (at most USERS_PAGE_MAX),
+        the users being then ordered by ID
+      - after: ID after which the users start, the last ID of the
+        previous page
+      - stream: json or ndjson, to write the users ordered by ID as they
+        are serialized, in a JSON array or one JSON object per line
     Return:
       - list of all User objects JSON represented
+      - a Link header to the next page if limit users were returned
+      - 400 if limit or stream is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    stream = request.args.get('stream')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return jsonify({'error': "limit must be a positive integer"}), 400
+        limit = min(limit, USERS_PAGE_MAX)
+    if stream not in (None, 'json', 'ndjson'):
+        return jsonify({'error': "stream must be json or ndjson"}), 400
+
+    if stream is not None:
+        mimetype = 'application/x-ndjson' if stream == 'ndjson' \
+            else 'application/json'
+        return Response(_stream_users(after, limit, stream == 'ndjson'),
+                        mimetype=mimetype)
+    if limit is None and after is None:
+        return _users_response(User.all())
+    users = User.page(after, limit)
+    response = _users_response(users)
+    if limit is not None and len(users) == limit:
+        response.headers['Link'] = '<{}>; rel="next"'.format(
+            url_for('app_views.view_all_users', limit=limit,
+                    after=users[-1].id))
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -30,7 +113,7 @@ def view_one_user(user_id: str = None) -> str:
     user = User.get(user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_json())
+    return _user_response(user)
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -83,7 +166,7 @@ def create_user() -> str:
             user.first_name = rj.get("first_name")
             user.last_name = rj.get("last_name")
             user.save()
-            return jsonify(user.to_json()), 201
+            return _user_response(user, 201)
         except Exception as e:
             error_msg = "Can't create User: {}".format(e)
     return jsonify({'error': error_msg}), 400
@@ -119,4 +202,4 @@ def update_user(user_id: str = None) -> str:
     if rj.get('last_name') is not None:
         user.last_name = rj.get('last_name')
     user.save()
-    return jsonify(user.to_json()), 200
+    return _user_response(user)
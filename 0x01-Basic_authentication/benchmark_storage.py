@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the User storage on generated snapshots:
+- load: cold start time of load_from_file, compared to building every
+  object with User(**obj_json) as the loader used to
+- memory: bytes per user held in DATA, compared to the former
+  representation (a __dict__ and two datetimes per user)
+- formats: save_to_file and load_from_file times and file sizes of
+  the JSON and binary snapshot formats
+
+Usage: ./benchmark_storage.py [load] [memory] [formats] [-n 10000 ...]
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+import models.base
+from models.base import DATA, LOAD_STATS, TIMESTAMP_FORMAT
+from models.user import User
+
+
+def make_snapshot(count: int) -> dict:
+    """ Serialized form of count generated users
+    """
+    objs_json = {}
+    start = datetime(2023, 1, 1)
+    for i in range(count):
+        obj_id = str(uuid.uuid4())
+        timestamp = (start + timedelta(seconds=i)).strftime(TIMESTAMP_FORMAT)
+        objs_json[obj_id] = {
+            'id': obj_id,
+            'created_at': timestamp,
+            'updated_at': timestamp,
+            'email': "user{}@hbtn.io".format(i),
+            '_password': uuid.uuid4().hex * 2,
+            'first_name': "First{}".format(i),
+            'last_name': "Last{}".format(i),
+        }
+    return objs_json
+
+
+def legacy_load():
+    """ Loading the snapshot the way load_from_file used to:
+    User(**obj_json) for every object, timestamps parsed by strptime
+    """
+    parse_timestamp = models.base.parse_timestamp
+    models.base.parse_timestamp = \
+        lambda value: datetime.strptime(value, TIMESTAMP_FORMAT)
+    try:
+        DATA['User'] = {}
+        with open(".db_User.json", 'r') as f:
+            objs_json = json.load(f)
+            for obj_id, obj_json in objs_json.items():
+                DATA['User'][obj_id] = User(**obj_json)
+    finally:
+        models.base.parse_timestamp = parse_timestamp
+
+
+def best_of(func, repeat: int) -> float:
+    """ Fastest of repeat runs of func, in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def bench_load(count: int, repeat: int) -> dict:
+    """ Load times of a snapshot of count users
+    """
+    with open(".db_User.json", 'w') as f:
+        json.dump(make_snapshot(count), f)
+    legacy = best_of(legacy_load, repeat)
+    seconds = best_of(User.load_from_file, repeat)
+    assert LOAD_STATS['User']['objects'] == count
+    return {'users': count, 'legacy_s': legacy, 'load_s': seconds,
+            'speedup': legacy / seconds}
+
+
+class DictUser():
+    """ User as it was represented before slots
+    """
+
+    def __init__(self, obj_json: dict):
+        """ Set the attributes of the user in its __dict__
+        """
+        self.__dict__.update(obj_json)
+        self.created_at = datetime.fromisoformat(obj_json['created_at'])
+        self.updated_at = datetime.fromisoformat(obj_json['updated_at'])
+
+
+def traced_bytes(func) -> int:
+    """ Memory allocated by func and still held after it returns
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(count: int) -> dict:
+    """ Bytes per user held in DATA for count users
+    """
+    with open(".db_User.json", 'w') as f:
+        json.dump(make_snapshot(count), f)
+
+    def load_dict_users():
+        with open(".db_User.json", 'r') as f:
+            objs_json = json.load(f)
+        DATA['User'] = {obj_id: DictUser(obj_json)
+                        for obj_id, obj_json in objs_json.items()}
+
+    def read_timestamps():
+        User.load_from_file()
+        for user in DATA['User'].values():
+            user.created_at
+            user.updated_at
+
+    result = {'users': count}
+    for name, func in (('dict', load_dict_users),
+                       ('slots', User.load_from_file),
+                       ('slots_read', read_timestamps)):
+        DATA['User'] = {}
+        result[name + '_bytes_per_user'] = traced_bytes(func) / count
+    DATA['User'] = {}
+    return result
+
+
+def bench_formats(count: int, repeat: int) -> dict:
+    """ Save and load times and file sizes of the snapshot formats
+    """
+    with open(".db_User.json", 'w') as f:
+        json.dump(make_snapshot(count), f)
+    User.load_from_file()
+    result = {'users': count}
+    snapshot_format = models.base.SNAPSHOT_FORMAT
+    try:
+        for name in ('json', 'binary'):
+            models.base.SNAPSHOT_FORMAT = name
+            # Objects as loaded from a snapshot in this format
+            User.save_to_file()
+            User.load_from_file()
+            result[name + '_save_s'] = best_of(User.save_to_file, repeat)
+            result[name + '_load_s'] = best_of(User.load_from_file, repeat)
+            result[name + '_bytes'] = os.path.getsize(User._snapshot_path())
+            assert LOAD_STATS['User']['objects'] == count
+    finally:
+        models.base.SNAPSHOT_FORMAT = snapshot_format
+    return result
+
+
+def main(argv: List[str] = None):
+    """ Command-line entry point, printing one JSON line per size
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('benchmarks', nargs='*',
+                        help="load, memory and/or formats (default: all)")
+    parser.add_argument('-n', '--users', type=int, nargs='+',
+                        default=[10000, 100000],
+                        help="snapshot sizes (default: 10000 100000)")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="runs per measure, the best is kept")
+    args = parser.parse_args(argv)
+    benchmarks = args.benchmarks or ['load', 'memory', 'formats']
+    for name in benchmarks:
+        if name not in ('load', 'memory', 'formats'):
+            parser.error("unknown benchmark: {}".format(name))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for count in args.users:
+                if 'load' in benchmarks:
+                    print(json.dumps(bench_load(count, args.repeat)))
+                if 'memory' in benchmarks:
+                    print(json.dumps(bench_memory(count)))
+                if 'formats' in benchmarks:
+                    print(json.dumps(bench_formats(count, args.repeat)))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Converting a .db_<class> snapshot between the JSON and the binary
+formats, the format of the input being detected.
+
+Usage: ./convert_snapshot.py .db_User.json .db_User.bin [--to binary]
+"""
+import argparse
+import json
+from datetime import timedelta
+from typing import BinaryIO, List
+from models import snapshot
+from models.base import (Base, EPOCH, SECOND, TIMESTAMP_FORMAT, Timestamp,
+                         parse_timestamp)
+
+
+TIMESTAMP_FIELDS = [key for key in Base.serialized_fields
+                    if isinstance(getattr(Base, key), Timestamp)]
+
+
+def read_records(data: bytes) -> dict:
+    """ Serialized objects of a snapshot by ID, as in the JSON format
+    """
+    if not snapshot.is_binary(data):
+        return json.loads(data)
+    count, columns = snapshot.load(data)
+    records = [{} for _ in range(count)]
+    for key, (kind, values) in columns.items():
+        if kind == b'T':
+            values = [(EPOCH + timedelta(seconds=value)).strftime(
+                TIMESTAMP_FORMAT) for value in values]
+        for record, value in zip(records, values):
+            record[key] = value
+    return {record['id']: record for record in records}
+
+
+def to_seconds(value) -> int:
+    """ Serialized timestamp in seconds since the epoch, None if it
+    isn't one written in TIMESTAMP_FORMAT
+    """
+    try:
+        timestamp = parse_timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    if timestamp.strftime(TIMESTAMP_FORMAT) != value:
+        return None
+    return (timestamp - EPOCH) // SECOND
+
+
+def write_binary(records: dict, f: BinaryIO):
+    """ Write serialized objects as a binary snapshot, a field missing
+    from an object being written as None
+    """
+    objs = list(records.values())
+    keys = []
+    for record in objs:
+        for key in record:
+            if key not in keys:
+                keys.append(key)
+    columns = []
+    for key in keys:
+        values = [record.get(key) for record in objs]
+        timestamp = key in TIMESTAMP_FIELDS
+        if timestamp:
+            seconds = [to_seconds(value) for value in values]
+            if None not in seconds:
+                values = seconds
+        columns.append((key, values, timestamp))
+    snapshot.dump(f, len(objs), columns)
+
+
+def main(argv: List[str] = None):
+    """ Command-line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('input', help="snapshot to convert")
+    parser.add_argument('output', help="converted snapshot")
+    parser.add_argument('--to', choices=['json', 'binary'], default=None,
+                        help="output format (default: the other one)")
+    args = parser.parse_args(argv)
+
+    with open(args.input, 'rb') as f:
+        data = f.read()
+    to = args.to or ('json' if snapshot.is_binary(data) else 'binary')
+    records = read_records(data)
+    if to == 'binary':
+        with open(args.output, 'wb') as f:
+            write_binary(records, f)
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(records, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,240 @@
 #!/usr/bin/env python3
 """ Base module
 """
-from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime, timedelta
+from operator import attrgetter
+from typing import Callable, TypeVar, List, Iterable
+from os import getenv, path
+from models.journal import Journal
+from models.rwlock import RWLock
+from models import snapshot
+from models.storage import SQLiteStorage
+from models.write_behind import WriteBehind
+import gc
+import itertools
 import json
+import os
+import threading
+import time
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
 DATA = {}
+INDEXES = {}
+# IDs of the stored objects of a class, sorted, to page through them
+SORTED_IDS = {}
+JOURNALS = {}
+# Objects loaded and seconds spent by the last load_from_file of a class
+LOAD_STATS = {}
+# Stamps of the object changes, invalidating their cached JSON
+VERSIONS = itertools.count(1)
+# DATA, INDEXES and SORTED_IDS are read under DATA_LOCK.read() and
+# changed under DATA_LOCK.write(). Writers are serialized by WRITE_LOCK,
+# held from the change to its persistence, so the files see the changes
+# in the order they were made
+DATA_LOCK = RWLock()
+WRITE_LOCK = threading.RLock()
+
+# 'snapshot' rewrites .db_<class>.json on every write, 'journal' only
+# appends the change to .db_<class>.journal, compacted into a snapshot
+# once it holds more than JOURNAL_COMPACT records and objects,
+# 'write_behind' marks the class dirty and rewrites the snapshot in the
+# background, at most WRITE_BEHIND_INTERVAL seconds after a change
+# or once WRITE_BEHIND_MAX_DIRTY changes are pending,
+# 'sqlite' keeps the objects in the SQLITE_DATABASE file instead of DATA,
+# its table of a class starting with the objects of the files
+STORAGE = getenv('BASE_STORAGE', 'snapshot')
+SQLITE_DATABASE = getenv('BASE_SQLITE_DATABASE', '.db.sqlite3')
+# Format of the snapshots written: 'json' to .db_<class>.json, 'binary'
+# (models.snapshot) to .db_<class>.bin, either one is read on load
+SNAPSHOT_FORMAT = getenv('BASE_SNAPSHOT_FORMAT', 'json')
+SNAPSHOT_EXTENSIONS = {'json': 'json', 'binary': 'bin'}
+JOURNAL_FSYNC = getenv('BASE_JOURNAL_FSYNC', 'always')
+JOURNAL_FSYNC_INTERVAL = float(getenv('BASE_JOURNAL_FSYNC_INTERVAL', '1'))
+JOURNAL_COMPACT = int(getenv('BASE_JOURNAL_COMPACT', '1000'))
+WRITE_BEHIND = WriteBehind(
+    float(getenv('BASE_WRITE_BEHIND_INTERVAL', '1')),
+    int(getenv('BASE_WRITE_BEHIND_MAX_DIRTY', '100')))
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string, an order of magnitude faster
+    than strptime
+    """
+    return datetime.fromisoformat(value)
+
+
+class Timestamp():
+    """ Datetime attribute kept in the slot of the same name prefixed
+    by '_', as whole seconds since the epoch, or as loaded in its
+    serialized form until first read
+    """
+
+    def __set_name__(self, owner: type, name: str):
+        """ Bind to the slot holding the value
+        """
+        self.name = name
+        slot = owner.__dict__['_' + name]
+        self.get_raw = slot.__get__
+        self.set_raw = slot.__set__
+
+    def __get__(self, obj: TypeVar('Base'), owner: type = None):
+        """ Value of the attribute, as a datetime
+        """
+        if obj is None:
+            return self
+        value = self.get_raw(obj, owner)
+        if type(value) is int:
+            return EPOCH + timedelta(seconds=value)
+        if type(value) is str:
+            value = parse_timestamp(value)
+            self.__set__(obj, value)
+        return value
+
+    def __set__(self, obj: TypeVar('Base'), value):
+        """ Set the value of the attribute, naive datetimes being
+        stored as seconds (the precision of the serialized form)
+        """
+        if type(value) is datetime and value.tzinfo is None:
+            value = (value - EPOCH) // SECOND
+        self.set_raw(obj, value)
+
+    def seconds(self, obj: TypeVar('Base')) -> int:
+        """ Value of the attribute in seconds since the epoch,
+        None if it isn't set to a naive timestamp
+        """
+        try:
+            value = self.get_raw(obj, type(obj))
+        except AttributeError:
+            return None
+        if type(value) is int:
+            return value
+        if type(value) is str:
+            try:
+                value = parse_timestamp(value)
+            except ValueError:
+                return None
+        if type(value) is datetime and value.tzinfo is None:
+            return (value - EPOCH) // SECOND
+        return None
+
+    def serialize(self, obj: TypeVar('Base')):
+        """ Serialized form of the attribute
+        """
+        value = self.get_raw(obj, type(obj))
+        if type(value) is int:
+            value = EPOCH + timedelta(seconds=value)
+        if type(value) is datetime:
+            return value.strftime(TIMESTAMP_FORMAT)
+        return value
+
+
+class Index():
+    """ Secondary hash indexes of the stored objects of a class
+    """
+
+    def __init__(self, attributes: Iterable[str]):
+        """ Initialize empty indexes on the attributes
+        """
+        self.attributes = tuple(attributes)
+        self.values = {attr: {} for attr in self.attributes}
+        self.order = {}
+        self._next = 0
+
+    def add(self, obj: TypeVar('Base')):
+        """ Index an object, keeping its rank in DATA if already known
+        """
+        if obj.id not in self.order:
+            self.order[obj.id] = self._next
+            self._next += 1
+        for attr in self.attributes:
+            self.add_value(obj, attr)
+
+    def discard(self, obj: TypeVar('Base'), keep_order: bool = False):
+        """ Remove an object from the indexes
+        """
+        for attr in self.attributes:
+            self.discard_value(obj, attr)
+        if not keep_order:
+            self.order.pop(obj.id, None)
+
+    def add_value(self, obj: TypeVar('Base'), attr: str):
+        """ Index the current value of one attribute of an object
+        """
+        value = getattr(obj, attr, None)
+        self.values[attr].setdefault(value, set()).add(obj.id)
+
+    def discard_value(self, obj: TypeVar('Base'), attr: str):
+        """ Remove the current value of one attribute of an object
+        """
+        value = getattr(obj, attr, None)
+        ids = self.values[attr].get(value)
+        if ids is not None:
+            ids.discard(obj.id)
+            if not ids:
+                del self.values[attr][value]
+
+    def lookup(self, attributes: dict) -> List[str]:
+        """ IDs of the objects matching the indexed attributes,
+        in the order of DATA
+        Raise TypeError if a value can't be hashed
+        """
+        ids = None
+        for attr, value in attributes.items():
+            if attr not in self.values:
+                continue
+            found = self.values[attr].get(value, ())
+            ids = set(found) if ids is None else ids & found
+        if len(ids) > 1:
+            return sorted(ids, key=self.order.get)
+        return list(ids)
 
 
 class Base():
     """ Base class
     """
 
+    # Attributes searched through a hash index (equality only)
+    # instead of a scan, they must hold hashable values
+    indexed_attributes = ()
+
+    # models.storage.Storage the objects are kept in,
+    # None for DATA and the .db_<class>.json files
+    storage = None
+
+    # Attributes are held in slots rather than a __dict__ per object,
+    # serialized_fields lists them in the order of the serialized form
+    __slots__ = ('id', '_created_at', '_updated_at', '_version', '_json')
+    serialized_fields = ('id', 'created_at', 'updated_at')
+
+    created_at = Timestamp()
+    updated_at = Timestamp()
+
+    def __init_subclass__(cls, **kwargs):
+        """ Prepare the serialization of a subclass
+        """
+        super().__init_subclass__(**kwargs)
+        cls._serializers = cls._make_serializers()
+
+    @classmethod
+    def _make_serializers(cls) -> tuple:
+        """ (key, function) pairs giving the serialized form of
+        each field of an object
+        """
+        serializers = []
+        for key in cls.serialized_fields:
+            field = getattr(cls, key)
+            if isinstance(field, Timestamp):
+                serializers.append((key, field.serialize))
+            else:
+                serializers.append((key, attrgetter(key)))
+        return tuple(serializers)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
@@ -25,16 +244,50 @@ class Base():
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
+    def __setattr__(self, name: str, value):
+        """ Set an attribute, keeping the indexes of a stored object
+        up to date
+        """
+        if name in self.indexed_attributes and self._is_stored():
+            with DATA_LOCK.write():
+                stored = self._is_stored()
+                if stored:
+                    index = self.__class__._index()
+                    index.discard_value(self, name)
+                object.__setattr__(self, name, value)
+                if stored:
+                    index.add_value(self, name)
+        else:
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_version', next(VERSIONS))
+
+    def _is_stored(self) -> bool:
+        """ Check if this object is the one stored in DATA under its ID
+        """
+        objs = DATA.get(self.__class__.__name__)
+        return objs is not None and \
+            objs.get(getattr(self, 'id', None)) is self
+
+    @classmethod
+    def _index(cls) -> Index:
+        """ Indexes of the class, built from DATA on first use
+        """
+        s_class = cls.__name__
+        index = INDEXES.get(s_class)
+        if index is None:
+            index = INDEXES[s_class] = Index(cls.indexed_attributes)
+            for obj in DATA.get(s_class, {}).values():
+                index.add(obj)
+        return index
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
         """
@@ -48,7 +301,14 @@ class Base():
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        for key, serialize in self._serializers:
+            if not for_serialization and key[0] == '_':
+                continue
+            try:
+                result[key] = serialize(self)
+            except AttributeError:
+                pass
+        for key, value in getattr(self, '__dict__', {}).items():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -57,54 +317,329 @@ class Base():
                 result[key] = value
         return result
 
+    def json_bytes(self) -> bytes:
+        """ to_json() encoded as jsonify does (sorted keys, compact
+        separators, without the final newline)
+        Cached with the version of the object it was encoded from, so
+        an attribute set meanwhile invalidates it
+        """
+        version = getattr(self, '_version', 0)
+        cached = getattr(self, '_json', None)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        data = json.dumps(self.to_json(), sort_keys=True,
+                          separators=(',', ':')).encode()
+        object.__setattr__(self, '_json', (version, data))
+        return data
+
+    @classmethod
+    def _journal(cls) -> Journal:
+        """ Journal of the class
+        """
+        s_class = cls.__name__
+        journal = JOURNALS.get(s_class)
+        if journal is None:
+            journal = JOURNALS[s_class] = Journal(
+                ".db_{}.journal".format(s_class),
+                JOURNAL_FSYNC, JOURNAL_FSYNC_INTERVAL)
+        return journal
+
+    @classmethod
+    def _setters(cls) -> List[Callable]:
+        """ Functions setting the serialized value of each serialized
+        field in a new object
+        """
+        setters = []
+        for key in cls.serialized_fields:
+            field = getattr(cls, key)
+            if isinstance(field, Timestamp):
+                setters.append(field.set_raw)
+            else:
+                setters.append(field.__set__)
+        return setters
+
+    @classmethod
+    def _loader(cls) -> Callable[[dict], TypeVar('Base')]:
+        """ Function building objects from their serialized form
+        Records holding exactly the serialized fields of the class skip
+        __init__: their values are set in the slots as they are,
+        timestamps being parsed on first read
+        Other keys of a record go in the __dict__ of the object, when
+        its class has one
+        """
+        keys = set(cls.serialized_fields)
+        setters = list(zip(cls.serialized_fields, cls._setters()))
+        new = cls.__new__
+
+        def build(obj_json: dict) -> TypeVar('Base'):
+            if obj_json.keys() != keys or \
+                    obj_json['created_at'] is None or \
+                    obj_json['updated_at'] is None:
+                obj = cls(**obj_json)
+                extra = obj_json.keys() - keys
+                if extra and hasattr(obj, '__dict__'):
+                    obj.__dict__.update(
+                        (key, obj_json[key]) for key in extra)
+                return obj
+            if obj_json['updated_at'] == obj_json['created_at']:
+                # Share one string between both timestamps
+                obj_json['updated_at'] = obj_json['created_at']
+            obj = new(cls)
+            for key, setter in setters:
+                setter(obj, obj_json[key])
+            return obj
+        return build
+
+    @classmethod
+    def _comparable_fields(cls) -> List[str]:
+        """ Serialized fields whose serialized form is their value,
+        so both compare the same
+        """
+        return [key for key in cls.serialized_fields
+                if not isinstance(getattr(cls, key), Timestamp)]
+
+    @classmethod
+    def _snapshot_path(cls, snapshot_format: str = None) -> str:
+        """ Path of the snapshot of the class in a format,
+        SNAPSHOT_FORMAT by default
+        """
+        return ".db_{}.{}".format(
+            cls.__name__, SNAPSHOT_EXTENSIONS[snapshot_format or
+                                              SNAPSHOT_FORMAT])
+
+    @classmethod
+    def _read_snapshot(cls, file_path: str) -> dict:
+        """ Objects of a snapshot by ID, its format being detected
+        """
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if not snapshot.is_binary(data):
+            build = cls._loader()
+            return {obj_id: build(obj_json)
+                    for obj_id, obj_json in json.loads(data).items()}
+
+        count, columns = snapshot.load(data)
+        fields = cls.serialized_fields
+        if list(columns) == list(fields) and all(
+                columns[key][0] == b'T' for key in fields
+                if isinstance(getattr(cls, key), Timestamp)):
+            # Same fields as the class: values go in the slots as they
+            # are, a column at a time, iterating in C through map
+            objs = list(map(cls.__new__, itertools.repeat(cls, count)))
+            for setter, key in zip(cls._setters(), fields):
+                deque(map(setter, objs, columns[key][1]), maxlen=0)
+            return dict(zip(columns['id'][1], objs))
+
+        records = [{} for _ in range(count)]
+        for key, (kind, values) in columns.items():
+            if kind == b'T':
+                values = [(EPOCH + timedelta(seconds=value)).strftime(
+                    TIMESTAMP_FORMAT) for value in values]
+            for record, value in zip(records, values):
+                record[key] = value
+        build = cls._loader()
+        return {record['id']: build(record) for record in records}
+
+    @classmethod
+    def _columns(cls, objs: List[TypeVar('Base')]) -> list:
+        """ Columns of the binary snapshot of objects
+        """
+        columns = []
+        for key, serialize in cls._serializers:
+            field = getattr(cls, key)
+            if not isinstance(field, Timestamp):
+                columns.append((key, [getattr(obj, key, None)
+                                      for obj in objs], False))
+                continue
+            values = [field.seconds(obj) for obj in objs]
+            if None in values:
+                # Not only naive timestamps, keep their serialized form
+                values = [serialize(obj) if hasattr(obj, '_' + key)
+                          else None for obj in objs]
+            columns.append((key, values, True))
+        extra = []
+        for obj in objs:
+            for key in getattr(obj, '__dict__', {}):
+                if key not in extra:
+                    extra.append(key)
+        for key in extra:
+            values = [getattr(obj, key, None) for obj in objs]
+            columns.append((key, [value.strftime(TIMESTAMP_FORMAT)
+                                  if type(value) is datetime else value
+                                  for value in values], False))
+        return columns
+
+    @classmethod
+    def _read_files(cls) -> dict:
+        """ Objects of the snapshot by ID, with the journal replayed
+        """
+        formats = [SNAPSHOT_FORMAT] + [snapshot_format for snapshot_format
+                                       in SNAPSHOT_EXTENSIONS
+                                       if snapshot_format != SNAPSHOT_FORMAT]
+        objs = {}
+        for snapshot_format in formats:
+            file_path = cls._snapshot_path(snapshot_format)
+            if path.exists(file_path):
+                # Loaded objects hold no reference cycles: don't let
+                # the collector walk them again and again as they
+                # pile up
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    objs = cls._read_snapshot(file_path)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+                break
+
+        build = cls._loader()
+        for record in cls._journal().replay():
+            if record.get('deleted'):
+                objs.pop(record['id'], None)
+            else:
+                objs[record['id']] = build(record['obj'])
+        return objs
+
     @classmethod
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from file, then replay the journal
+        A storage gets the objects of the files when its storage of the
+        class is created, so switching to it keeps them
         """
+        started = time.perf_counter()
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
+        if cls.storage is not None:
+            DATA.setdefault(s_class, {})
+            with WRITE_LOCK:
+                count = cls.storage.load(
+                    cls, lambda: list(cls._read_files().values()))
+            LOAD_STATS[s_class] = {'objects': count,
+                                   'seconds': time.perf_counter() - started}
             return
-
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        with WRITE_LOCK:
+            objs = cls._read_files()
+            journal = cls._journal()
+            with DATA_LOCK.write():
+                DATA[s_class] = objs
+                INDEXES.pop(s_class, None)
+                SORTED_IDS.pop(s_class, None)
+            if journal.records > 0 and STORAGE != 'journal':
+                # Snapshot writes don't go through the journal anymore
+                cls.compact()
+        LOAD_STATS[s_class] = {'objects': len(objs),
+                               'seconds': time.perf_counter() - started}
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
+        The snapshot is written aside then renamed over the previous one,
+        so a crash never leaves a torn file
+        Nothing to do with a storage, it writes each change
         """
+        if cls.storage is not None:
+            return
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        file_path = cls._snapshot_path()
+        with WRITE_LOCK:
+            with DATA_LOCK.read():
+                objs = list(DATA[s_class].items())
+
+            tmp_path = "{}.tmp".format(file_path)
+            if SNAPSHOT_FORMAT == 'binary':
+                values = [obj for obj_id, obj in objs]
+                with open(tmp_path, 'wb') as f:
+                    snapshot.dump(f, len(values), cls._columns(values))
+                    if STORAGE != 'journal' or JOURNAL_FSYNC != 'never':
+                        f.flush()
+                        os.fsync(f.fileno())
+            else:
+                objs_json = {}
+                for obj_id, obj in objs:
+                    objs_json[obj_id] = obj.to_json(True)
+                with open(tmp_path, 'w') as f:
+                    json.dump(objs_json, f)
+                    if STORAGE != 'journal' or JOURNAL_FSYNC != 'never':
+                        f.flush()
+                        os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+            # Only the latest snapshot may be found on load
+            for snapshot_format in SNAPSHOT_EXTENSIONS:
+                other_path = cls._snapshot_path(snapshot_format)
+                if other_path != file_path and path.exists(other_path):
+                    os.remove(other_path)
+
+    @classmethod
+    def compact(cls):
+        """ Write a fresh snapshot and empty the journal
+        """
+        cls.save_to_file()
+        cls._journal().reset()
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def _write(cls, obj_id: str, obj: TypeVar('Base') = None):
+        """ Persist the change of one object (None when removed)
+        """
+        if STORAGE == 'write_behind':
+            WRITE_BEHIND.mark(cls)
+            return
+        if STORAGE != 'journal':
+            cls.save_to_file()
+            return
+        journal = cls._journal()
+        if obj is None:
+            journal.append({'id': obj_id, 'deleted': True})
+        else:
+            journal.append({'id': obj_id, 'obj': obj.to_json(True)})
+        if journal.records > max(JOURNAL_COMPACT, cls.count()):
+            cls.compact()
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        if self.storage is not None:
+            self.storage.save(self)
+            return
+        with WRITE_LOCK:
+            with DATA_LOCK.write():
+                stored = DATA[s_class].get(self.id)
+                if stored is not self:
+                    index = self.__class__._index()
+                    if stored is not None:
+                        index.discard(stored, keep_order=True)
+                    DATA[s_class][self.id] = self
+                    index.add(self)
+                    if stored is None and s_class in SORTED_IDS:
+                        insort(SORTED_IDS[s_class], self.id)
+            self.__class__._write(self.id, self)
 
     def remove(self):
         """ Remove object
         """
+        if self.storage is not None:
+            self.storage.remove(self)
+            return
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with WRITE_LOCK:
+            with DATA_LOCK.write():
+                stored = DATA[s_class].pop(self.id, None)
+                if stored is not None:
+                    self.__class__._index().discard(stored)
+                    ids = SORTED_IDS.get(s_class)
+                    if ids is not None:
+                        i = bisect_left(ids, self.id)
+                        if i < len(ids) and ids[i] == self.id:
+                            del ids[i]
+            if stored is not None:
+                self.__class__._write(self.id)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
+        if cls.storage is not None:
+            return cls.storage.count(cls)
         s_class = cls.__name__
         return len(DATA[s_class].keys())
 
@@ -114,17 +649,48 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def _sorted_ids(cls) -> List[str]:
+        """ Sorted IDs of the class, built from DATA on first use
+        """
+        s_class = cls.__name__
+        ids = SORTED_IDS.get(s_class)
+        if ids is None:
+            ids = SORTED_IDS[s_class] = sorted(DATA[s_class])
+        return ids
+
+    @classmethod
+    def page(cls, after: str = None,
+             limit: int = None) -> List[TypeVar('Base')]:
+        """ Objects ordered by ID, the first one being the one following
+        the ID after (which doesn't have to exist anymore), at most limit
+        """
+        if cls.storage is not None:
+            return cls.storage.page(cls, after, limit)
+        s_class = cls.__name__
+        with DATA_LOCK.read():
+            ids = cls._sorted_ids()
+            start = 0 if after is None else bisect_right(ids, after)
+            end = None if limit is None else start + limit
+            return [DATA[s_class][obj_id] for obj_id in ids[start:end]]
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
+        if cls.storage is not None:
+            return cls.storage.get(cls, id)
         s_class = cls.__name__
         return DATA[s_class].get(id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
+        Equality on an indexed attribute is looked up in its index,
+        the other attributes are checked on the objects found
         """
+        if cls.storage is not None:
+            return cls.storage.search(cls, attributes)
         s_class = cls.__name__
         def _search(obj):
             if len(attributes) == 0:
@@ -133,5 +699,21 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        with DATA_LOCK.read():
+            objs = None
+            if any(k in cls.indexed_attributes for k in attributes):
+                try:
+                    ids = cls._index().lookup(attributes)
+                    objs = [DATA[s_class][obj_id] for obj_id in ids]
+                except TypeError:
+                    pass
+            if objs is None:
+                objs = list(DATA[s_class].values())
+        return list(filter(_search, objs))
+
+
+Base._serializers = Base._make_serializers()
+
+if STORAGE == 'sqlite':
+    Base.storage = SQLiteStorage(SQLITE_DATABASE)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+""" Journal module
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Iterator
+
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+
+class Journal():
+    """ Append-only file of changes, one JSON record per line
+    """
+
+    def __init__(self, file_path: str, fsync: str = 'always',
+                 fsync_interval: float = 1.0):
+        """ Initialize a journal
+        - fsync: 'always' syncs every record to disk, 'interval' at most
+          fsync_interval seconds after a record, 'never' leaves it to
+          the OS
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError("Unknown fsync policy: {}".format(fsync))
+        self.file_path = file_path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.records = 0
+        self._file = None
+        self._synced_at = time.monotonic()
+        self._timer = None
+        self._lock = threading.Lock()
+        self._at_exit = False
+
+    def replay(self) -> Iterator[dict]:
+        """ Read back the records of the journal
+        A torn last line, left by a crash during a write, is skipped and
+        cut off the file, so the next records don't get glued to it.
+        An unreadable line before the last one raises a ValueError
+        """
+        self.records = 0
+        if not os.path.exists(self.file_path):
+            return
+        end = 0
+        torn = None
+        with open(self.file_path, 'rb') as f:
+            for number, line in enumerate(f, 1):
+                if torn is not None:
+                    raise ValueError("Corrupted journal {} at line {}"
+                                     .format(self.file_path, torn))
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("Unterminated line")
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    torn = number
+                    continue
+                end += len(line)
+                self.records += 1
+                yield record
+        if torn is not None:
+            with self._lock:
+                self._close()
+                with open(self.file_path, 'r+b') as f:
+                    f.truncate(end)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def append(self, record: dict):
+        """ Write a record at the end of the journal
+        """
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.file_path, 'a')
+                if not self._at_exit:
+                    atexit.register(self.close)
+                    self._at_exit = True
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+            self.records += 1
+            if self.fsync == 'always':
+                self._sync()
+            elif self.fsync == 'interval':
+                remaining = self.fsync_interval - \
+                    (time.monotonic() - self._synced_at)
+                if remaining <= 0:
+                    self._sync()
+                elif self._timer is None:
+                    # Nothing may wait longer than the interval, even
+                    # if no other record comes to trigger the sync
+                    self._timer = threading.Timer(remaining, self.sync)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _sync(self):
+        """ Sync the journal file, called with the lock held
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+        self._synced_at = time.monotonic()
+
+    def sync(self):
+        """ Sync the records written so far to disk
+        """
+        with self._lock:
+            self._sync()
+
+    def _close(self):
+        """ Sync and close the journal file, called with the lock held
+        """
+        if self._file is not None:
+            self._file.flush()
+            if self.fsync != 'never':
+                self._sync()
+            self._file.close()
+            self._file = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def reset(self):
+        """ Empty the journal, once its records are in a snapshot
+        """
+        with self._lock:
+            self._close()
+            if os.path.exists(self.file_path):
+                os.remove(self.file_path)
+            self.records = 0
+
+    def close(self):
+        """ Sync and close the journal file
+        """
+        with self._lock:
+            self._close()
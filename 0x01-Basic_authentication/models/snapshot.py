@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+""" Binary snapshot module
+
+A snapshot stores the objects of a class column by column:
+- header: MAGIC, version (uint16), object count (uint32),
+  column count (uint16)
+- each column: name (uint16 length + UTF-8), kind (1 byte),
+  payload length (uint64) + payload, the kind being:
+  - 'T': timestamps as seconds since the epoch, int64 each
+  - 'I': integers, int64 each
+  - 'S': strings or None, an int32 length in characters per value
+    (-1 for None) followed by the UTF-8 of the values concatenated
+  - 'J': any other values, as a UTF-8 JSON array
+Numbers are little-endian.
+"""
+import json
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Dict, Iterable, List, Tuple
+
+
+MAGIC = b'\x89BSNP\r\n\x1a'
+VERSION = 1
+
+HEADER = struct.Struct('<HIH')
+NAME = struct.Struct('<H')
+PAYLOAD = struct.Struct('<cQ')
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def is_binary(head: bytes) -> bool:
+    """ Check if the first bytes of a file are the ones of a snapshot
+    """
+    return head.startswith(MAGIC)
+
+
+def _little_endian(values: array) -> array:
+    """ Swap the bytes of an array on big-endian machines
+    """
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def encode_column(values: List, timestamp: bool = False) -> Tuple[bytes,
+                                                                  bytes]:
+    """ Kind and payload of a column
+    - timestamp: integer values are timestamps
+    """
+    if all(type(value) is int and INT64_MIN <= value <= INT64_MAX
+           for value in values):
+        payload = _little_endian(array('q', values)).tobytes()
+        return (b'T' if timestamp else b'I'), payload
+    if all(type(value) is str or value is None for value in values):
+        lengths = array('i', [-1 if value is None else len(value)
+                              for value in values])
+        text = ''.join([value for value in values if value is not None])
+        return b'S', _little_endian(lengths).tobytes() + \
+            text.encode('utf-8', 'surrogatepass')
+    return b'J', json.dumps(values).encode('utf-8')
+
+
+def decode_column(kind: bytes, payload: bytes, count: int) -> List:
+    """ Values of a column
+    """
+    if kind in (b'T', b'I'):
+        values = array('q')
+        values.frombytes(payload)
+        return _little_endian(values).tolist()
+    if kind == b'S':
+        lengths = array('i')
+        lengths.frombytes(payload[:4 * count])
+        text = payload[4 * count:].decode('utf-8', 'surrogatepass')
+        values = []
+        append = values.append
+        position = 0
+        for length in _little_endian(lengths):
+            if length < 0:
+                append(None)
+            else:
+                end = position + length
+                append(text[position:end])
+                position = end
+        return values
+    if kind == b'J':
+        return json.loads(payload.decode('utf-8'))
+    raise ValueError("Unknown column kind: {}".format(kind))
+
+
+def dump(f: BinaryIO, count: int,
+         columns: Iterable[Tuple[str, List, bool]]):
+    """ Write a snapshot of count objects
+    - columns: (name, values, timestamp) of each column
+    """
+    columns = list(columns)
+    f.write(MAGIC)
+    f.write(HEADER.pack(VERSION, count, len(columns)))
+    for name, values, timestamp in columns:
+        if len(values) != count:
+            raise ValueError("Column {} holds {} values for {} objects"
+                             .format(name, len(values), count))
+        kind, payload = encode_column(values, timestamp)
+        name = name.encode('utf-8')
+        f.write(NAME.pack(len(name)) + name)
+        f.write(PAYLOAD.pack(kind, len(payload)))
+        f.write(payload)
+
+
+def load(data: bytes) -> Tuple[int, Dict[str, Tuple[bytes, List]]]:
+    """ Read a snapshot
+    Return the object count and, by column name, the kind and values
+    of the column
+    """
+    if not is_binary(data):
+        raise ValueError("Not a binary snapshot")
+    position = len(MAGIC)
+    version, count, column_count = HEADER.unpack_from(data, position)
+    if version > VERSION:
+        raise ValueError("Unsupported snapshot version: {}"
+                         .format(version))
+    position += HEADER.size
+    columns = {}
+    for _ in range(column_count):
+        length, = NAME.unpack_from(data, position)
+        position += NAME.size
+        name = data[position:position + length].decode('utf-8')
+        position += length
+        kind, length = PAYLOAD.unpack_from(data, position)
+        position += PAYLOAD.size
+        payload = data[position:position + length]
+        if len(payload) != length:
+            raise ValueError("Truncated snapshot")
+        position += length
+        columns[name] = (kind, decode_column(kind, payload, count))
+    return count, columns
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+""" Write-behind module
+"""
+import atexit
+import threading
+import time
+
+
+class WriteBehind():
+    """ Background flusher coalescing the writes of the marked classes
+    """
+
+    def __init__(self, interval: float = 1.0, max_dirty: int = 100):
+        """ Initialize a flusher
+        - interval: seconds a change may wait before being written
+        - max_dirty: changes after which the write happens right away
+        """
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self.flushes = 0
+        self._dirty = {}
+        self._changes = 0
+        self._closed = False
+        self._thread = None
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+
+    def mark(self, cls: type):
+        """ Record a change of a class, to be written by the flusher
+        """
+        with self._condition:
+            if self._closed:
+                flush_now = True
+            else:
+                flush_now = False
+                self._dirty[cls.__name__] = cls
+                self._changes += 1
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name='write-behind', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+                self._condition.notify()
+        if flush_now:
+            cls.save_to_file()
+
+    def _take(self) -> dict:
+        """ Take the dirty classes, called with the condition held
+        """
+        dirty, self._dirty, self._changes = self._dirty, {}, 0
+        return dirty
+
+    def _write(self, dirty: dict):
+        """ Write a snapshot of each dirty class
+        A class that fails to write is marked dirty again
+        """
+        with self._write_lock:
+            for s_class, cls in dirty.items():
+                try:
+                    cls.save_to_file()
+                except Exception:
+                    with self._condition:
+                        self._dirty.setdefault(s_class, cls)
+                        self._changes += 1
+                else:
+                    self.flushes += 1
+
+    def _run(self):
+        """ Flusher loop: wait for a first change, then for the interval
+        or max_dirty changes, and write everything changed meanwhile
+        """
+        while True:
+            with self._condition:
+                while not self._dirty and not self._closed:
+                    self._condition.wait()
+                deadline = time.monotonic() + self.interval
+                while not self._closed and self._changes < self.max_dirty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                dirty = self._take()
+                closed = self._closed
+            self._write(dirty)
+            if closed:
+                return
+
+    def flush(self):
+        """ Write the pending changes now
+        """
+        with self._condition:
+            dirty = self._take()
+        self._write(dirty)
+
+    def close(self):
+        """ Stop the flusher, writing the pending changes
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Stress test of the User storage under concurrent threads: each thread
+runs a mix of reads (get, search by email, all, page) and writes
+(create, update, remove) for a while. For each thread count, prints
+the operations per second and the errors raised, then checks that
+reloading the files gives back exactly the users in memory.
+
+Usage: ./stress_storage.py [-t 1 2 4 8 16] [-d SECONDS] [-w WRITE_RATIO]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import List
+from models.base import WRITE_BEHIND
+from models.user import User
+
+
+def worker(deadline: float, write_ratio: float, seed: int,
+           counts: dict, errors: list):
+    """ Run random operations until deadline
+    """
+    rand = random.Random(seed)
+    ops = 0
+    while time.monotonic() < deadline:
+        try:
+            if rand.random() < write_ratio:
+                roll = rand.random()
+                if roll < 0.4:
+                    user = User()
+                    user.email = "{}@stress.io".format(rand.random())
+                    user.save()
+                elif roll < 0.8:
+                    users = User.page(limit=1)
+                    if users:
+                        users[0].email = "{}@stress.io".format(rand.random())
+                        users[0].save()
+                else:
+                    users = User.page(limit=1)
+                    if users:
+                        users[0].remove()
+            else:
+                roll = rand.random()
+                if roll < 0.4:
+                    users = User.page(limit=10)
+                    if users:
+                        User.get(users[-1].id)
+                elif roll < 0.8:
+                    users = User.page(limit=1)
+                    if users:
+                        User.search({'email': users[0].email})
+                elif roll < 0.9:
+                    User.all()
+                else:
+                    for user in User.page(limit=10):
+                        user.to_json()
+            ops += 1
+        except Exception as error:
+            errors.append(repr(error))
+    counts[seed] = ops
+
+
+def stress(threads: int, duration: float, write_ratio: float) -> dict:
+    """ Run threads workers for duration seconds
+    """
+    counts = {}
+    errors = []
+    deadline = time.monotonic() + duration
+    workers = [threading.Thread(target=worker,
+                                args=(deadline, write_ratio, seed,
+                                      counts, errors))
+               for seed in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    in_memory = {user.id: user.to_json(True) for user in User.all()}
+    WRITE_BEHIND.flush()
+    User.load_from_file()
+    on_disk = {user.id: user.to_json(True) for user in User.all()}
+    return {'threads': threads, 'ops': sum(counts.values()),
+            'ops_per_s': sum(counts.values()) / elapsed,
+            'errors': len(errors), 'first_errors': errors[:3],
+            'persisted': on_disk == in_memory,
+            'users': len(in_memory)}
+
+
+def main(argv: List[str] = None):
+    """ Command-line entry point, printing one JSON line per thread count
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-t', '--threads', type=int, nargs='+',
+                        default=[1, 2, 4, 8, 16],
+                        help="thread counts (default: 1 2 4 8 16)")
+    parser.add_argument('-d', '--duration', type=float, default=2,
+                        help="seconds per thread count (default: 2)")
+    parser.add_argument('-w', '--write-ratio', type=float, default=0.1,
+                        help="share of writes (default: 0.1)")
+    parser.add_argument('-n', '--users', type=int, default=1000,
+                        help="users created first (default: 1000)")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            User.load_from_file()
+            for i in range(args.users):
+                User(email="user{}@stress.io".format(i)).save()
+            for threads in args.threads:
+                print(json.dumps(stress(threads, args.duration,
+                                        args.write_ratio)))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
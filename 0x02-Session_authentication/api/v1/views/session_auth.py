@@ -6,7 +6,7 @@ a module defining all session authentication routes
 
 import os
 from api.v1.views import app_views
-from flask import abort, jsonify, request, make_response
+from flask import Response, abort, jsonify, request, make_response
 from models.user import User
 
 
@@ -44,7 +44,9 @@ def session_login():
     from api.v1.app import auth
     session_name = os.getenv("SESSION_NAME")
     session_id = auth.create_session(user_being_searched[0].id)
-    response = make_response(jsonify(user_being_searched[0].to_json()))
+    response = make_response(Response(
+        user_being_searched[0].json_bytes() + b'\n',
+        mimetype='application/json'))
 
     if session_name and session_id:
         response.set_cookie(session_name, session_id)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+""" Readers-writer lock module
+"""
+import threading
+from contextlib import contextmanager
+
+
+class RWLock():
+    """ Lock shared by any number of readers, or held by one writer
+    Waiting writers go first, so a flow of readers can't starve them.
+    Not reentrant: a thread holding it must not acquire it again
+    """
+
+    def __init__(self):
+        """ Initialize an unlocked lock
+        """
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """ Hold the lock as a reader
+        """
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """ Hold the lock as the writer
+        """
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+""" Storage module
+"""
+import json
+import sqlite3
+import threading
+from typing import Callable, List, TypeVar
+
+
+class Storage():
+    """ Interface of the storages keeping Base objects instead of the
+    in-memory DATA and its .db_<class>.json files
+    """
+
+    def load(self, cls: type,
+             initial: Callable[[], List[TypeVar('Base')]] = None) -> int:
+        """ Prepare the storage of a class, return its object count
+        - initial: function returning the objects to store when the
+          storage of the class is created, the ones of its files
+        """
+        raise NotImplementedError
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or update an object
+        """
+        raise NotImplementedError
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete an object
+        """
+        raise NotImplementedError
+
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """ Object of a class by ID, None if it doesn't exist
+        """
+        raise NotImplementedError
+
+    def search(self, cls: type,
+               attributes: dict) -> List[TypeVar('Base')]:
+        """ Objects of a class whose attributes equal the given ones,
+        in the order they were created
+        """
+        raise NotImplementedError
+
+    def count(self, cls: type) -> int:
+        """ Number of objects of a class
+        """
+        raise NotImplementedError
+
+    def page(self, cls: type, after: str = None,
+             limit: int = None) -> List[TypeVar('Base')]:
+        """ Objects of a class ordered by ID, starting after the ID after,
+        at most limit
+        """
+        raise NotImplementedError
+
+
+class SQLiteStorage(Storage):
+    """ Storage in a SQLite database: a table per class named after it,
+    a column per serialized field holding its serialized value, the
+    indexed attributes of the class being indexed columns
+    """
+
+    # Types compared with the same semantics by SQLite and Python
+    SQL_TYPES = (str, int, float, type(None))
+    # Column holding, as a JSON object, the attributes an object keeps
+    # in its __dict__ besides its serialized fields
+    EXTRA_COLUMN = '__dict__'
+    # UPSERT (INSERT ... ON CONFLICT DO UPDATE) came with SQLite 3.24
+    MIN_SQLITE_VERSION = (3, 24, 0)
+
+    def __init__(self, database: str):
+        """ Initialize a storage in the database file
+        Each thread gets its own connection
+        """
+        if sqlite3.sqlite_version_info < self.MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                "SQLiteStorage needs SQLite {} or later, found {}".format(
+                    '.'.join(map(str, self.MIN_SQLITE_VERSION)),
+                    sqlite3.sqlite_version))
+        self.database = database
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._comparable = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        """ Connection of the current thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.database, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create(self, connection: sqlite3.Connection, cls: type) -> str:
+        """ Create the table of a class, or add the columns and indexes
+        it misses, return its quoted name
+        """
+        table = '"{}"'.format(cls.__name__)
+        columns = ", ".join('"{}"'.format(field) for field
+                            in self._columns(cls) if field != 'id')
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS {} (id TEXT PRIMARY KEY, {})"
+            .format(table, columns))
+        existing = {row[1] for row in connection.execute(
+            "PRAGMA table_info({})".format(table))}
+        for field in self._columns(cls):
+            if field not in existing:
+                connection.execute(
+                    'ALTER TABLE {} ADD COLUMN "{}"'.format(table, field))
+        for attr in cls.indexed_attributes:
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS "{}_{}" ON {} ("{}")'
+                .format(cls.__name__, attr, table, attr))
+        self._comparable[cls.__name__] = frozenset(cls._comparable_fields())
+        return table
+
+    def _table(self, cls: type) -> str:
+        """ Quoted name of the table of a class, created on first use
+        with the columns and indexes it misses
+        """
+        table = self._tables.get(cls.__name__)
+        if table is not None:
+            return table
+        with self._lock:
+            connection = self._connection()
+            with connection:
+                table = self._create(connection, cls)
+            self._tables[cls.__name__] = table
+        return table
+
+    def _columns(self, cls: type) -> tuple:
+        """ Columns of the table of a class
+        """
+        return cls.serialized_fields + (self.EXTRA_COLUMN,)
+
+    def _upsert(self, cls: type, table: str) -> str:
+        """ Query inserting or updating the row of an object
+        """
+        fields = self._columns(cls)
+        return "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT(id) DO " \
+            "UPDATE SET {}".format(
+                table, ", ".join('"{}"'.format(field) for field in fields),
+                ", ".join("?" * len(fields)),
+                ", ".join('"{0}" = excluded."{0}"'.format(field)
+                          for field in fields if field != 'id'))
+
+    def _row(self, obj: TypeVar('Base')) -> list:
+        """ Column values of an object
+        """
+        obj_json = obj.to_json(True)
+        row = [obj_json.pop(field, None)
+               for field in type(obj).serialized_fields]
+        row.append(json.dumps(obj_json) if obj_json else None)
+        return row
+
+    def _select(self, cls: type, where: str = "", params: tuple = (),
+                order: str = "rowid") -> List[TypeVar('Base')]:
+        """ Objects of the rows selected by a WHERE clause
+        """
+        query = "SELECT {} FROM {} {} ORDER BY {}".format(
+            ", ".join('"{}"'.format(field) for field in self._columns(cls)),
+            self._table(cls), where, order)
+        build = cls._loader()
+        fields = cls.serialized_fields
+        objs = []
+        for row in self._connection().execute(query, params):
+            obj_json = dict(zip(fields, row))
+            if row[-1] is not None:
+                obj_json.update(json.loads(row[-1]))
+            objs.append(build(obj_json))
+        return objs
+
+    def load(self, cls: type,
+             initial: Callable[[], List[TypeVar('Base')]] = None) -> int:
+        """ Create the table of a class if needed, return its row count
+        - initial: function returning the objects to insert when the
+          table doesn't exist yet, in the transaction creating it, so
+          they are imported exactly once
+        """
+        if initial is not None and cls.__name__ not in self._tables:
+            with self._lock:
+                connection = self._connection()
+                with connection:
+                    # Taking the write lock first, so only one process
+                    # creates and fills the table
+                    connection.execute("BEGIN IMMEDIATE")
+                    exists = connection.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                        "AND name = ?", (cls.__name__,)).fetchone()
+                    if exists is None:
+                        objs = initial()
+                        table = self._create(connection, cls)
+                        connection.executemany(self._upsert(cls, table),
+                                               map(self._row, objs))
+        self._table(cls)
+        return self.count(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or update the row of an object, keeping its rowid
+        """
+        cls = type(obj)
+        query = self._upsert(cls, self._table(cls))
+        connection = self._connection()
+        with connection:
+            connection.execute(query, self._row(obj))
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete the row of an object
+        """
+        table = self._table(type(obj))
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM {} WHERE id = ?".format(table),
+                               (obj.id,))
+
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """ Object of a class by ID, None if it doesn't exist
+        """
+        if type(obj_id) not in self.SQL_TYPES:
+            return None
+        objs = self._select(cls, "WHERE id = ?", (obj_id,))
+        return objs[0] if objs else None
+
+    def search(self, cls: type,
+               attributes: dict) -> List[TypeVar('Base')]:
+        """ Objects of a class whose attributes equal the given ones,
+        in the order they were created
+        Attributes that aren't columns, columns that don't hold the value
+        of the attribute (timestamps...), or values SQLite doesn't compare
+        the way Python does, are checked on all objects
+        """
+        self._table(cls)
+        comparable = self._comparable[cls.__name__]
+        conditions = []
+        params = []
+        for attr, value in attributes.items():
+            if attr not in comparable or type(value) not in self.SQL_TYPES:
+                return [obj for obj in self._select(cls)
+                        if all(getattr(obj, k) == v
+                               for k, v in attributes.items())]
+            if value is None:
+                conditions.append('"{}" IS NULL'.format(attr))
+            else:
+                conditions.append('"{}" = ?'.format(attr))
+                params.append(value)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return self._select(cls, where, tuple(params))
+
+    def count(self, cls: type) -> int:
+        """ Number of objects of a class
+        """
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM {}".format(self._table(cls))).fetchone()[0]
+
+    def page(self, cls: type, after: str = None,
+             limit: int = None) -> List[TypeVar('Base')]:
+        """ Objects of a class ordered by ID, starting after the ID after,
+        at most limit
+        """
+        where = "" if after is None else "WHERE id > ?"
+        params = () if after is None else (after,)
+        if limit is not None:
+            return self._select(cls, where, params + (limit,),
+                                "id LIMIT ?")
+        return self._select(cls, where, params, "id")
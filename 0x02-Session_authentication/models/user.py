@@ -9,6 +9,11 @@ class User(Base):
     """ User class
     """
 
+    indexed_attributes = ('email',)
+
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+    serialized_fields = Base.serialized_fields + __slots__
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
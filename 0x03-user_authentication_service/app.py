@@ -6,6 +6,7 @@ Basic Flask app
 
 from auth import Auth
 from flask import Flask, jsonify, request, abort, redirect
+from hash_queue import HasherBusy
 from typing import Union
 
 
@@ -25,6 +26,32 @@ def index() -> str:
     return jsonify({"message": "Bienvenue"}), 200
 
 
+@app.errorhandler(HasherBusy)
+def hasher_busy(error) -> str:
+    """
+    Failing fast when the password hashing queue is full
+    or the hashing timed out.
+
+    Returns:
+        dict: JSON payload with a 503 status.
+    """
+    response = jsonify({"message": "service busy, retry later"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+@app.route('/hasher', methods=['GET'], strict_slashes=False)
+def hasher_stats() -> str:
+    """
+    A GET route exposing the queue depth and latency
+    of the password hashing.
+
+    Returns:
+        dict: JSON payload.
+    """
+    return jsonify(AUTH.hasher_stats())
+
+
 @app.route('/users', methods=['POST'], strict_slashes=False)
 def user_registration() -> str:
     """
@@ -5,7 +5,11 @@ authenticating modules
 
 
 import bcrypt
+import hashlib
+import hmac
+import os
 from db import DB
+from hash_queue import BoundedHasher, SingleFlight
 from user import User
 import uuid
 from typing import Union
@@ -49,6 +53,19 @@ class Auth:
 
     def __init__(self):
         self._db = DB()
+        self._hasher = BoundedHasher()
+        self._logins = SingleFlight()
+        # Per-process key, so in-flight logins are not keyed on passwords
+        self._login_key = os.urandom(32)
+
+    def hasher_stats(self) -> dict:
+        """
+        Getting the queue depth and latency of the password hashing.
+
+        Returns:
+            dict: The statistics of the hashing executor.
+        """
+        return self._hasher.stats()
 
     @staticmethod
     def _hash_password(password: str) -> str:
@@ -84,6 +101,8 @@ class Auth:
         Raises:
             ValueError:
                 If a user with the provided email already exists.
+            HasherBusy:
+                If the password could not be hashed in time.
         """
         try:
             user = self._db.find_user_by(email=email)
@@ -93,7 +112,7 @@ class Auth:
         except NoResultFound:
             # If NoResultFound exception is caught,
             # and proceed with user registration
-            hashed_password = self._hash_password(password)
+            hashed_password = self._hasher.run(self._hash_password, password)
             new_user = self._db.add_user(email, hashed_password)
 
             return new_user
@@ -112,12 +131,22 @@ class Auth:
             bool:
                 True if the credentials are valid
                 False otherwise.
+
+        Raises:
+            HasherBusy:
+                If the password could not be checked in time.
         """
         try:
             user = self._db.find_user_by(email=email)
         except NoResultFound:
             return False
-        return bcrypt.checkpw(password.encode('utf-8'), user.hashed_password)
+        # Concurrent checks of the same password against the same hash
+        # share a single bcrypt call
+        password = password.encode('utf-8')
+        key = (email, user.hashed_password, hmac.new(
+            self._login_key, password, hashlib.sha256).digest())
+        return self._logins.do(key, self._hasher.run, bcrypt.checkpw,
+                               password, user.hashed_password)
 
     def create_session(self, email: str) -> Union[str, None]:
         """
@@ -215,14 +244,20 @@ class Auth:
 
         Returns:
             None
+
+        Raises:
+            ValueError:
+                If no user has the reset token.
+            HasherBusy:
+                If the password could not be hashed in time.
         """
         try:
             user = self._db.find_user_by(reset_token=reset_token)
         except NoResultFound:
             raise ValueError
 
-        # Hashing the new password
-        hashed_password = _hash_password(new_password)
+        # Hashing the new password off the request thread
+        hashed_password = self._hasher.run(_hash_password, new_password)
 
         # Update the user's hashed_password and reset_token fields
         self._db.update_user(
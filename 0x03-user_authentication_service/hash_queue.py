@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Bounded executor running the bcrypt work off the request threads
+"""
+
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Callable, Dict, Hashable
+
+
+HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', os.cpu_count() or 1))
+HASH_QUEUE_SIZE = int(os.getenv('AUTH_HASH_QUEUE_SIZE', '32'))
+HASH_TIMEOUT = float(os.getenv('AUTH_HASH_TIMEOUT', '5'))
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full or the work timed out
+    """
+
+
+class BoundedHasher:
+    """Thread pool with a bounded queue for password hashing.
+
+    At most workers + max_queue operations are accepted at once,
+    further ones are rejected right away instead of piling up.
+    """
+
+    def __init__(
+        self,
+        workers: int = HASH_WORKERS,
+        max_queue: int = HASH_QUEUE_SIZE,
+        timeout: float = HASH_TIMEOUT,
+        samples: int = 1024
+    ) -> None:
+        """Initialize the executor
+
+        Args:
+            workers (int): threads running the hashes.
+            max_queue (int): operations allowed to wait for a thread.
+            timeout (float): seconds a caller waits for its result.
+            samples (int): latencies kept to compute the statistics.
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            workers, thread_name_prefix='hasher')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latencies = deque(maxlen=samples)
+        self._counts = {'completed': 0, 'rejected': 0, 'timeouts': 0}
+
+    def _done(self, future: Future, started: float) -> None:
+        """Record a finished (or cancelled) operation and free its slot
+        """
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self._counts['completed'] += 1
+                self._latencies.append(time.perf_counter() - started)
+        self._slots.release()
+
+    def run(self, func: Callable, *args):
+        """Run func(*args) on the executor and wait for its result.
+
+        Returns:
+            The result of func.
+
+        Raises:
+            HasherBusy:
+                If the queue is full, or the result did not come
+                within the timeout.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counts['rejected'] += 1
+            raise HasherBusy("hashing queue is full")
+        with self._lock:
+            self._pending += 1
+        started = time.perf_counter()
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda done: self._done(done, started))
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._counts['timeouts'] += 1
+            raise HasherBusy("hashing timed out")
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth and hash latency statistics
+
+        Returns:
+            dict:
+                pending operations (running or queued), queue depth,
+                capacity, counters and latency in milliseconds
+                (average, p50 and p99 of the recent operations).
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._counts)
+            stats['pending'] = self._pending
+        stats['queue_depth'] = max(stats['pending'] - self.workers, 0)
+        stats['capacity'] = self.workers + self.max_queue
+        if latencies:
+            stats['latency_avg_ms'] = \
+                sum(latencies) / len(latencies) * 1000
+            stats['latency_p50_ms'] = latencies[len(latencies) // 2] * 1000
+            stats['latency_p99_ms'] = \
+                latencies[min(int(len(latencies) * 0.99),
+                              len(latencies) - 1)] * 1000
+        return stats
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one computation.
+
+    Callers arriving while a call with the same key is in flight wait
+    for it and share its result (or exception). Nothing is kept once
+    the call is over: the next caller starts a new computation.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the in-flight calls registry
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, func: Callable, *args):
+        """Run func(*args), unless a call with the same key is in flight.
+
+        Returns:
+            The result of func, computed by this call or shared
+            with the call in flight.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as error:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(error)
+            raise
+        with self._lock:
+            del self._calls[key]
+        future.set_result(result)
+        return result
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests of the coalescing of concurrent login checks
+"""
+
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import bcrypt
+
+from auth import Auth
+from hash_queue import SingleFlight
+
+
+THREADS = 8
+DELAY = 0.2
+
+
+def run_threads(targets: list) -> list:
+    """Run each target on its own thread, all starting together
+
+    Returns:
+        list: The result (or exception) of each target, in order.
+    """
+    results = [None] * len(targets)
+    barrier = threading.Barrier(len(targets))
+
+    def run(i: int) -> None:
+        barrier.wait()
+        try:
+            results[i] = targets[i]()
+        except Exception as error:
+            results[i] = error
+
+    threads = [threading.Thread(target=run, args=(i,))
+               for i in range(len(targets))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class CountingCall:
+    """Slow callable counting its calls
+    """
+
+    def __init__(self, func) -> None:
+        """Wrap func
+        """
+        self.func = func
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        """Count the call, wait DELAY seconds and call func
+        """
+        with self._lock:
+            self.calls += 1
+        time.sleep(DELAY)
+        return self.func(*args)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Tests of SingleFlight
+    """
+
+    def test_same_key_shares_one_call(self):
+        """Concurrent calls with the same key run func once
+        """
+        flight = SingleFlight()
+        func = CountingCall(lambda value: [value])
+        results = run_threads([lambda: flight.do('key', func, 1)] * THREADS)
+        self.assertEqual(func.calls, 1)
+        self.assertEqual(results, [[1]] * THREADS)
+
+    def test_different_keys_dont_share(self):
+        """Concurrent calls with different keys each run func
+        """
+        flight = SingleFlight()
+        func = CountingCall(lambda value: value)
+        results = run_threads([
+            (lambda i=i: flight.do(i, func, i)) for i in range(THREADS)])
+        self.assertEqual(func.calls, THREADS)
+        self.assertEqual(results, list(range(THREADS)))
+
+    def test_exception_is_shared(self):
+        """Waiting callers get the exception of the call in flight
+        """
+        def fail():
+            raise KeyError('boom')
+
+        flight = SingleFlight()
+        func = CountingCall(fail)
+        results = run_threads([lambda: flight.do('key', func)] * THREADS)
+        self.assertEqual(func.calls, 1)
+        for result in results:
+            self.assertIsInstance(result, KeyError)
+
+    def test_nothing_kept_after_the_call(self):
+        """A call after the previous one is over computes again
+        """
+        flight = SingleFlight()
+        func = CountingCall(lambda: object())
+        first = flight.do('key', func)
+        second = flight.do('key', func)
+        self.assertEqual(func.calls, 2)
+        self.assertIsNot(first, second)
+
+
+class TestValidLogin(unittest.TestCase):
+    """Tests of the coalescing of Auth.valid_login
+    """
+
+    email = 'bob@hbtn.io'
+    password = 'MyPwdOfBob'
+
+    def setUp(self):
+        """Auth with a single user, in a temporary directory
+        """
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        self.auth = Auth()
+        # Looking the user up on every thread would need a session each
+        user = SimpleNamespace(email=self.email, hashed_password=bcrypt.hashpw(
+            self.password.encode('utf-8'), bcrypt.gensalt(4)))
+        patcher = mock.patch.object(self.auth._db, 'find_user_by',
+                                    return_value=user)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.checkpw = CountingCall(bcrypt.checkpw)
+        patcher = mock.patch('bcrypt.checkpw', self.checkpw)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove the temporary directory
+        """
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_same_password_single_bcrypt_call(self):
+        """Concurrent logins with the same password check it once
+        """
+        results = run_threads([
+            lambda: self.auth.valid_login(self.email, self.password)
+        ] * THREADS)
+        self.assertEqual(self.checkpw.calls, 1)
+        self.assertEqual(results, [True] * THREADS)
+
+    def test_same_wrong_password_single_bcrypt_call(self):
+        """Concurrent logins with the same wrong password check it once
+        """
+        results = run_threads([
+            lambda: self.auth.valid_login(self.email, 'wrong')
+        ] * THREADS)
+        self.assertEqual(self.checkpw.calls, 1)
+        self.assertEqual(results, [False] * THREADS)
+
+    def test_different_passwords_never_share(self):
+        """Concurrent logins with different passwords each get their own
+        result, the right password among wrong ones included
+        """
+        passwords = ['wrong{}'.format(i) for i in range(THREADS - 2)]
+        passwords[len(passwords) // 2:len(passwords) // 2] = \
+            [self.password, self.password.lower()]
+        results = run_threads([
+            (lambda password=password:
+             self.auth.valid_login(self.email, password))
+            for password in passwords])
+        self.assertEqual(self.checkpw.calls, THREADS)
+        self.assertEqual(results, [password == self.password
+                                   for password in passwords])
+
+    def test_mixed_passwords(self):
+        """Right and wrong passwords sent concurrently, several times
+        each, run one check per distinct password
+        """
+        passwords = [self.password, 'wrong'] * (THREADS // 2)
+        results = run_threads([
+            (lambda password=password:
+             self.auth.valid_login(self.email, password))
+            for password in passwords])
+        self.assertEqual(self.checkpw.calls, 2)
+        self.assertEqual(results, [password == self.password
+                                   for password in passwords])
+
+
+if __name__ == '__main__':
+    unittest.main()